@@ -8,172 +8,153 @@ from hlt import constants
 from hlt.positionals import Direction
 from hlt.positionals import Position
 from hlt.entity import Dropoff
+from hlt.collisions import assign_moves, resolve_conflicts
+from hlt.convolution import Kernel, correlate, scatter_cells
 import logging
 import numpy as np
 from collections import defaultdict
-from debugger import Debugger
+from debugger import Debugger, TraceRecorder, trace_code
 from hlt.commands import *
 
 
 def count_total_ships():
     total = 0
     for id, player in game.players.items():
-        total += len(player.get_ships())
+        total += len(player.fleet)
     return total
 
 def turns_left():
     return constants.MAX_TURNS - game.turn_number
 
 def dist_from_dropoff(pos):
-    shortest = 999
-    for dropoff in me.get_dropoffs() + [me.shipyard]:
-        dis = game_map.calculate_distance(pos, dropoff.position)
-        shortest = min(shortest, dis)
-    return shortest
+    return int(me.dropoff_distance[pos.y, pos.x])
 
 def on_dropoff(pos):
-    for dropoff in me.get_dropoffs() + [me.shipyard]:
-        if dropoff.position == pos:
-            return True
-    return False
-
-
-def get_surroundings(matrix, pos, radius):
-    x, y = pos.x, pos.y
-    return matrix.take(range(y - radius, y + radius + 1), axis=0, mode='wrap').take(range(x - radius, x + radius + 1), axis=1, mode='wrap')
-
-def surrounding_halite(pos, radius=None):
-    if radius is None:
-        radius = game_map.width // 2 - 1
-    return get_surroundings(halite_matrix, pos, radius)
-
-def surrounding_neighbors(pos, radius=4):
-    return get_surroundings(neighbor_matrix, pos, radius)
-
-def surrounding_enemies(pos, radius=1):
-    return get_surroundings(enemy_matrix, pos, radius)
-
-
-def calculate_longterm_halite(ship, pos):
-    if immune_timer[ship.id] > 0:
-        return 0
-
-    surroundings = surrounding_halite(pos)
-    clipped = np.clip(surroundings*.75, 0, constants.MAX_HALITE - ship.halite_amount)
-    modified = np.clip(clipped - surroundings * .1, 0, None)
-    modified = clipped**2 / average_halite
-    weighted_sum = np.sum(weight_matrix * modified)
-    score = weighted_sum / 4
-    return score
-
-def calculate_space_remaining(ship):
-    return (constants.MAX_HALITE - ship.halite_amount) / constants.MAX_HALITE
-
-def calculate_dropoff_benefit(ship, pos):
-    dis = dist_from_dropoff(pos)
-    turns_needed = dis + len(me.get_ships()) / 4 + 2
-
-    # if turns_needed <= turns_left() < turns_needed + game_map.width /2 + ((constants.MAX_HALITE - ship.halite_amount) /(average_halite / 12)):
-    #     return 0
-
-    dropoff_benefit = ship.halite_amount * .9**dis / 2
-    return dropoff_benefit
-
-def calculate_urgency_factor(ship, pos):
-    dis = dist_from_dropoff(pos)
-    turns_needed = dis + len(me.get_ships()) / 4 + 2
+    return me.dropoff_distance[pos.y, pos.x] == 0
+
+
+# Every weighted window sum is computed for the whole map at once, and only once per
+# cargo amount for the terms that depend on it
+def longterm_values(halite, cargo):
+    clipped = np.clip(halite*.75, 0, constants.MAX_HALITE - cargo)
+    return clipped**2
+
+def longterm_field(cargo):
+    field = longterm_fields.get(cargo)
+    if field is None:
+        field = correlate(longterm_values(halite_matrix, cargo), longterm_kernel)
+        longterm_fields[cargo] = field
+    return field
+
+def shortterm_field(cargo):
+    field = shortterm_fields.get(cargo)
+    if field is None:
+        clipped = np.clip(halite_matrix * 1.5, 0, constants.MAX_HALITE - cargo * 1.1)
+        field = correlate(clipped, shortterm_kernel)
+        shortterm_fields[cargo] = field
+    return field
+
+
+# Moves are scored for the whole fleet at once. Each calculate_* helper takes the scored
+# ships' fleet rows and returns a ships x moves array, with moves in direction code order
+DX = np.array([0, 0, 1, -1, 0])
+DY = np.array([-1, 1, 0, 0, 0])
+STILL = Direction.to_code(Direction.Still)
+COMPONENTS = ['immediate', 'longterm', 'dropoff', 'urgent', 'neighbor', 'inspiration', 'enemy',
+              'refuel', 'on_dropoff', 'pastpos']
+COLUMNS = {component: column for column, component in enumerate(COMPONENTS)}
+
+def for_each_cargo(rows, field_for_cargo):
+    values = np.zeros((len(rows), 5))
+    cargo = me.fleet.halite[rows]
+    for amount in np.unique(cargo).tolist():
+        same = cargo == amount
+        values[same] = field_for_cargo(amount)[dest_y[rows[same]], dest_x[rows[same]]]
+    return values
+
+def calculate_longterm_halite(rows):
+    longterm = np.zeros((len(rows), 5))
+    active = ~immune[rows]
+    longterm[active] = for_each_cargo(rows[active], longterm_field) / average_halite / 4
+    return longterm
+
+def calculate_dropoff_benefit(rows):
+    dis = me.dropoff_distance[dest_y[rows], dest_x[rows]]
+    return me.fleet.halite[rows, None] * .9**dis / 2
+
+def calculate_urgency_factor(rows):
+    dis = me.dropoff_distance[dest_y[rows], dest_x[rows]]
+    turns_needed = dis + len(me.fleet) / 4 + 2
+    return np.where(turns_needed > turns_left(), me.fleet.halite[rows, None] * .9**dis * 100, 0)
+
+def calculate_neighbor_penalty(rows):
+    weighted_sum = neighbor_field[dest_y[rows], dest_x[rows]]
+    return weighted_sum * average_halite
 
-    if turns_needed > turns_left():
-        return ship.halite_amount * .9**dis * 100
+def calculate_immediate_halite(rows):
+    cargo = me.fleet.halite[rows]
+    cell_halite = game_map.halite[me.fleet.y[rows], me.fleet.x[rows]]
 
-    return 0
+    gained = np.where(inspired[me.fleet.y[rows], me.fleet.x[rows]],
+                      game.constants.gained(cell_halite, cargo, True),
+                      game.constants.gained(cell_halite, cargo, False))
+    space_remaining = (constants.MAX_HALITE - cargo) / constants.MAX_HALITE
+    penalty = game.constants.move_cost[cell_halite] * space_remaining
 
-def calculate_neighbor_penalty(ship, pos):
-    # if pos == me.shipyard.position:
-    #     return 0
-    surroundings = surrounding_neighbors(pos)
-    weighted_sum = np.sum(neighbor_weight_matrix * surroundings)
+    immediate = np.repeat(-penalty[:, None], 5, axis=1)
+    immediate[:, STILL] = gained.astype(np.float64)**2 / (average_halite/8)
+    return immediate
 
-    # debug.log(surroundings)
-    # debug.log("Ship {} Pos {} Penalty {}".format(ship.id, pos, weighted_sum * 150))
+def calculate_past_position_penalty(rows):
+    past = past_positions[rows]
+    returning = (dest_x[rows] == past[:, 0, None]) & (dest_y[rows] == past[:, 1, None])
+    on_dropoff = me.dropoff_distance[me.fleet.y[rows], me.fleet.x[rows]] == 0
+    return np.where(returning & ~on_dropoff[:, None], 9999, 0)
 
-    return weighted_sum * average_halite
+def calculate_need_refuel(rows):
+    cell_halite = game_map.halite[me.fleet.y[rows], me.fleet.x[rows]]
+    return np.where(me.fleet.halite[rows] < game.constants.move_cost[cell_halite], 99999, 0)
 
-def calculate_immediate_halite(ship, dir, pos):
-    if dir is Direction.Still:
-        percent_collected = .75 if is_inspired(ship) else .25
-        return min(game_map[ship.position].halite_amount * percent_collected, constants.MAX_HALITE - ship.halite_amount)**2 / (average_halite/8)
-
-    space_remaining = calculate_space_remaining(ship)
-    penalty = game_map[ship.position].halite_amount * .1
-    penalty *= space_remaining    
-    return -penalty
-    
-
-def calculate_past_position_penalty(ship, pos):
-    penalty = 0
-    if ship.id in past_pos and pos == past_pos[ship.id] and not on_dropoff(ship.position):
-        penalty = 9999
-    return penalty
-
-def calculate_need_refuel(ship):
-    score = 0
-    # if (ship.halite_amount < game_map[ship.position].halite_amount * .2):
-    #     score = 20
-    if (ship.halite_amount < game_map[ship.position].halite_amount * .1):
-        score = 99999
-    return score
-
-def is_inspired(ship):
-    surroundings = surrounding_enemies(ship.position, radius=4)
-    return np.sum(surroundings * inspired_weight_matrix) >= 2
-
-def calculate_inspiration_bonus(ship, pos):
+def calculate_inspiration_bonus(rows):
+    bonus = np.zeros((len(rows), 5))
     if len(game.players) == 2:
-        return 0
-    if immune_timer[ship.id] > 0:
-        return 0
-    surroundings = surrounding_enemies(pos, radius=10)
-    nearby_halite = surrounding_halite(pos, radius=2)
-    clipped = np.clip(nearby_halite * 1.5, 0, constants.MAX_HALITE - ship.halite_amount * 1.1)
-    weighted_sum_enemies = np.sum(inspiration_weight_matrix * surroundings)
-    weighted_sum_halite = np.sum(shortterm_weight_matrix * clipped)
-    return weighted_sum_enemies * weighted_sum_halite * 5
-
-def calculate_enemy_penalty(ship, pos):
-    surroundings = surrounding_enemies(pos, radius=1)
-    weighted_sum = np.sum(enemy_weight_matrix * surroundings)
+        return bonus
+    active = rows[~immune[rows]]
+    weighted_sum_enemies = inspiration_field[dest_y[active], dest_x[active]]
+    bonus[~immune[rows]] = weighted_sum_enemies * for_each_cargo(active, shortterm_field) * 5
+    return bonus
+
+def calculate_enemy_penalty(rows):
+    weighted_sum = enemy_field[dest_y[rows], dest_x[rows]]
+    cargo = me.fleet.halite[rows, None]
     if len(game.players) == 2:
-        return weighted_sum * max(0, ship.halite_amount - 300) / 4
+        return weighted_sum * np.maximum(0, cargo - 300) / 4
     else:
-        return weighted_sum * average_halite * (1 + ship.halite_amount / constants.MAX_HALITE) * 30
-
-
-def score_move(ship, dir):
-    pos = game_map.normalize(ship.position.directional_offset(dir))
-    score = move_scores[ship.id][dir]
-
-    score['immediate'] = calculate_immediate_halite(ship, dir, pos)
-    score['longterm'] = calculate_longterm_halite(ship, pos)
-    score['dropoff'] = calculate_dropoff_benefit(ship, pos)
-    score['urgent'] = calculate_urgency_factor(ship, pos)
-    score['neighbor'] = -calculate_neighbor_penalty(ship, pos)
-    score['inspiration'] = calculate_inspiration_bonus(ship, pos)
-    score['enemy'] = -calculate_enemy_penalty(ship, pos)
-    if dir is Direction.Still:
-        score['refuel'] = calculate_need_refuel(ship)
-        score['on_dropoff'] = -9999 if on_dropoff(ship.position) else 0
-    else:
-        score['pastpos'] = -calculate_past_position_penalty(ship, pos)
+        return weighted_sum * average_halite * (1 + cargo / constants.MAX_HALITE) * 30
+
+
+# Every component except the neighbour penalty, which depends on the ships planned before
+def score_moves(rows):
+    score = move_scores
+    score[rows, :, COLUMNS['immediate']] = calculate_immediate_halite(rows)
+    score[rows, :, COLUMNS['longterm']] = calculate_longterm_halite(rows)
+    score[rows, :, COLUMNS['dropoff']] = calculate_dropoff_benefit(rows)
+    score[rows, :, COLUMNS['urgent']] = calculate_urgency_factor(rows)
+    score[rows, :, COLUMNS['inspiration']] = calculate_inspiration_bonus(rows)
+    score[rows, :, COLUMNS['enemy']] = -calculate_enemy_penalty(rows)
+    score[rows, STILL, COLUMNS['refuel']] = calculate_need_refuel(rows)
+    score[rows, STILL, COLUMNS['on_dropoff']] = np.where(
+        me.dropoff_distance[me.fleet.y[rows], me.fleet.x[rows]] == 0, -9999, 0)
+    score[rows, :STILL, COLUMNS['pastpos']] = -calculate_past_position_penalty(rows)[:, :STILL]
 
 def should_convert_to_dropoff(ship):
     halite_required = 4000 - ship.halite_amount - game_map[ship.position].halite_amount
     dist = dist_from_dropoff(ship.position)
-    weighted_sum = np.sum(dropoff_weight_matrix * surrounding_halite(ship.position, radius=6))
+    weighted_sum = np.sum(dropoff_weight_matrix * game_map.padded_halite.window(ship.position, 6))
     if weighted_sum * (min(dist, 14))**2 / 800 > halite_required:
         if me.halite_amount >= halite_required:
             me.halite_amount -= halite_required
-            me._dropoffs[999] = Dropoff(me.id, 999, ship.position)
+            me.plan_dropoff(Dropoff(me.id, 999, ship.position))
             return True
         else:
             save_for_dropoff = True
@@ -183,39 +164,28 @@ def build_weight_matrix(radius=None, discount_rate=.9, center=1):
     if not radius:
         radius = game_map.width // 2 - 1
 
-    mat = np.zeros((2*radius + 1, 2*radius + 1))
-    for x in range(-radius, radius + 1):
-        for y in range(-radius, radius + 1):
-            dis = np.abs(x) + np.abs(y)
-            mat[y + radius, x + radius] = ((discount_rate ** dis) / (4*dis)) if dis > 0 else center
-    return mat
-
-def build_halite_matrix():
-    mat = np.zeros((game_map.width, game_map.height))
-    for x in range(game_map.width):
-        for y in range(game_map.height):
-            mat[y, x] = game_map[Position(x, y)].halite_amount
+    dis = game.tables.manhattan_window(radius)
+    with np.errstate(divide='ignore'):
+        mat = (discount_rate ** dis) / (4*dis)
+    mat[radius, radius] = center
     return mat
 
 def build_enemy_matrix():
     mat = np.zeros((game_map.width, game_map.height))
     for id, player in game.players.items():
         if player != me:
-            for ship in player.get_ships():
-                pos = ship.position
-                mat[pos.y, pos.x] = 1
+            mat[player.fleet.y, player.fleet.x] = 1
     return mat
 
 
-def compute_plan(ship):
-    best_move = None
-    best_score = -99999
-    for move, score in move_scores[ship.id].items():
-        total_score = sum(score.values())
-        if total_score > best_score:
-            best_move = move
-            best_score = total_score
-    return best_move
+def compute_plan(rows):
+    # Components are added up in COMPONENTS order, skipping the ones a move does not have
+    total = np.zeros((len(rows), 5))
+    for column in range(len(COMPONENTS)):
+        component = move_scores[rows, :, column]
+        total += np.where(np.isnan(component), 0, component)
+    move_totals[rows] = total
+    return total.argmax(axis=1)
 
 def planned_pos(ship):
     if planned_moves[ship.id] == CONSTRUCT:
@@ -224,70 +194,80 @@ def planned_pos(ship):
     return game_map.normalize(ship.position.directional_offset(planned_moves[ship.id]))
 
 
-def compute_scores():
-    for ship in sorted(me.get_ships(), key=lambda s:(s.halite_amount, dist_from_dropoff(s.position)), reverse=True):
-        if ship.id in planned_moves and planned_moves[ship.id] == CONSTRUCT:
-            continue
-
-        for d in Direction.get_all_cardinals() + [Direction.Still]:
-            score_move(ship, d)
-        planned_moves[ship.id] = compute_plan(ship)
-
-        ppos = planned_pos(ship)
-        if ppos is not None:
-            neighbor_matrix[ppos.y, ppos.x] = 1
-
-
-def resolve_collisions():   
-    def find_active_positions():
-        active_positions = defaultdict(set)
+def rank_waves(rows):
+    """
+    Splits ships, already in rank order, into waves that can be planned together.
+    A ship's neighbour penalty can only be changed by a ship within Chebyshev distance 6,
+    so each ship goes in the wave after the last one holding such a higher ranked ship.
+    """
+    dx = np.abs(me.fleet.x[rows, None] - me.fleet.x[rows])
+    dy = np.abs(me.fleet.y[rows, None] - me.fleet.y[rows])
+    near = np.maximum(np.minimum(dx, game_map.width - dx), np.minimum(dy, game_map.height - dy)) <= 6
+    waves = np.zeros(len(rows), dtype=int)
+    for i in range(1, len(rows)):
+        earlier = waves[:i][near[i, :i]]
+        if len(earlier):
+            waves[i] = earlier.max() + 1
+    return [rows[waves == wave] for wave in range(waves.max() + 1)] if len(rows) else []
 
-        for ship in me.get_ships():
-            ppos = planned_pos(ship)
-            if ppos is not None:
-                active_positions[ppos].add(ship)
-
-        return active_positions 
-
-    has_collisions = True
-    while has_collisions:
-        active_positions = find_active_positions()
-
-        has_collisions = False
-        for pos, ships in active_positions.items():
-            if on_dropoff(pos) and turns_left() < (len(me.get_ships()) / 4 + 2):
-                continue
-            if len(ships) > 1:
-                has_collisions = True
-                # print_info('{} ships at {}:'.format(len(ships), pos))
-                ship_to_move = None
-                least_halite_amt = 9999
-                for ship in ships:
-                    if planned_moves[ship.id] is Direction.Still:
-                        # print_info('A ship wants to stay still!')
-                        # if one wants to stay still, everyone should stay still
-                        ship_to_move = None
-                        break
-
-                    # move ship sitting on least halite
-                    amt = game_map[ship.position].halite_amount
-                    if amt < least_halite_amt:
-                        ship_to_move = ship
-                        least_halite_amt = amt
-
-                if ship_to_move:
-                    if game_map[pos].is_occupied and game_map[pos].ship.owner == me.id:
-                        planned = planned_pos(game_map[pos].ship)
-                        if planned:
-                            ship_to_move = game_map[planned].ship
-
-                for ship in ships:
-                    if ship is not ship_to_move:
-                        planned_moves[ship.id] = Direction.Still
+def compute_scores():
+    cargo = me.fleet.halite.tolist()
+    dis = me.dropoff_distance[me.fleet.y, me.fleet.x].tolist()
+    ranked = sorted(range(len(ship_ids)), key=lambda row: (cargo[row], dis[row]), reverse=True)
+    rows = np.array([row for row in ranked if planned_moves.get(ship_ids[row]) != CONSTRUCT], dtype=int)
+    score_moves(rows)
+    yield
+
+    for wave in rank_waves(rows):
+        move_scores[wave, :, COLUMNS['neighbor']] = -calculate_neighbor_penalty(wave)
+        plans = compute_plan(wave)
+        for row, plan in zip(wave.tolist(), plans.tolist()):
+            planned_moves[ship_ids[row]] = Direction.from_code(plan)
+
+        # Ships in a wave are too far apart to claim the same cell
+        px = dest_x[wave, plans]
+        py = dest_y[wave, plans]
+        unclaimed = neighbor_matrix[py, px] == 0
+        neighbor_matrix[py[unclaimed], px[unclaimed]] = 1
+        scatter_cells(neighbor_field, neighbor_kernel, px[unclaimed], py[unclaimed], np.ones(unclaimed.sum()))
+        yield
+
+
+def moving_rows():
+    return np.array([row for row, ship_id in enumerate(ship_ids)
+                     if planned_moves.get(ship_id, CONSTRUCT) != CONSTRUCT], dtype=int)
+
+def shared_cells():
+    if turns_left() < (len(me.fleet) / 4 + 2):
+        # At the very end, ships may crash into a dropoff together
+        return me.dropoff_distance.ravel() == 0
+    return None
+
+def resolve_collisions_quickly():
+    rows = moving_rows()
+    plans = np.array([Direction.to_code(planned_moves[ship_ids[row]]) for row in rows.tolist()], dtype=int)
+    cells = me.fleet.y[rows] * game_map.width + me.fleet.x[rows]
+    targets = dest_y[rows, plans] * game_map.width + dest_x[rows, plans]
+    # The ship that would lose the most by staying still keeps its move
+    priorities = move_totals[rows, plans] - move_totals[rows, STILL]
+
+    targets, downgraded = resolve_conflicts(cells, targets, priorities, shared_cells())
+    for row, cell, target in zip(rows.tolist(), cells.tolist(), targets.tolist()):
+        if cell == target:
+            planned_moves[ship_ids[row]] = Direction.Still
+    debug.log("Stopped %d ships to avoid collisions", downgraded)
+
+def resolve_collisions():
+    rows = moving_rows()
+    destinations = dest_y[rows] * game_map.width + dest_x[rows]
+    moves, total = assign_moves(move_totals[rows], destinations, shared_cells())
+    for row, move in zip(rows.tolist(), moves.tolist()):
+        planned_moves[ship_ids[row]] = Direction.from_code(move)
+    debug.log("Assigned moves scoring %s", total)
 
 def consider_spawning():
     if save_for_dropoff:
-        return
+        return False
 
     def shipyard_will_be_occupied():
         for ship in me.get_ships():
@@ -298,8 +278,32 @@ def consider_spawning():
 
     expected_return_per_frame = average_halite / (8 + count_total_ships()/10)
     new_ship_is_worthwhile = expected_return_per_frame * turns_left() > constants.SHIP_COST
-    if new_ship_is_worthwhile and me.halite_amount >= constants.SHIP_COST and not shipyard_will_be_occupied():
-        command_queue.append(me.shipyard.spawn())
+    return new_ship_is_worthwhile and me.halite_amount >= constants.SHIP_COST and not shipyard_will_be_occupied()
+
+def plan_turn():
+    st = time.process_time()
+    yield from compute_scores()
+    debug.log("Computing scores: %s", time.process_time() - st)
+    chosen_moves = dict(planned_moves) if trace.enabled else None
+
+    debug.print_score_tables(ship_ids, move_scores, COMPONENTS)
+
+    # A safe set of moves first, then the best one if there is time for it
+    st = time.process_time()
+    resolve_collisions_quickly()
+    debug.log("Collisions: %s", time.process_time() - st)
+    yield dict(planned_moves), consider_spawning()
+
+    st = time.process_time()
+    resolve_collisions()
+    debug.log("Assignment: %s", time.process_time() - st)
+
+    if trace.enabled:
+        trace.record(game.turn_number, ship_ids, move_scores,
+                     [trace_code(chosen_moves[ship_id]) for ship_id in ship_ids],
+                     [trace_code(planned_moves[ship_id]) for ship_id in ship_ids])
+
+    yield dict(planned_moves), consider_spawning()
 
 def manage_immune_timer():
     for ship in me.get_ships():
@@ -314,26 +318,18 @@ def manage_immune_timer():
 np.set_printoptions(precision=1)
 debug = Debugger()
 
-game = hlt.Game()
+game = hlt.Game(async_logging=True, max_log_records_per_turn=2000)
 me = game.me
 game_map = game.game_map
+trace = TraceRecorder("trace-{}.bin".format(game.my_id) if Debugger.TRACE else None, COMPONENTS)
 
-weight_matrix = build_weight_matrix()
-neighbor_weight_matrix = build_weight_matrix(radius=4, center=5)
-inspiration_weight_matrix = build_weight_matrix(radius=10, center=0)
-shortterm_weight_matrix=build_weight_matrix(radius=2, discount_rate=.5)
-inspired_weight_matrix = np.array([
-    [0   , 0   , 0   , 0   , 1   , 0   , 0   , 0   , 0   ],
-    [0   , 0   , 0   , 1   , 1   , 1   , 0   , 0   , 0   ],
-    [0   , 0   , 1   , 1   , 1   , 1   , 1   , 0   , 0   ],
-    [0   , 1   , 1   , 1   , 1   , 1   , 1   , 1   , 0   ],
-    [1   , 1   , 1   , 1   , 1   , 1   , 1   , 1   , 1   ],
-    [0   , 1   , 1   , 1   , 1   , 1   , 1   , 1   , 0   ],
-    [0   , 0   , 1   , 1   , 1   , 1   , 1   , 0   , 0   ],
-    [0   , 0   , 0   , 1   , 1   , 1   , 0   , 0   , 0   ],
-    [0   , 0   , 0   , 0   , 1   , 0   , 0   , 0   , 0   ]
-])
-enemy_weight_matrix = np.array([
+game.precompute()
+
+longterm_kernel = Kernel(build_weight_matrix())
+neighbor_kernel = Kernel(build_weight_matrix(radius=4, center=5))
+inspiration_kernel = Kernel(build_weight_matrix(radius=10, center=0))
+shortterm_kernel = Kernel(build_weight_matrix(radius=2, discount_rate=.5))
+enemy_kernel = Kernel([
     [0   , .6  , 0   ],
     [.6  , 1   , .6  ],
     [0   , .6  , 0   ]
@@ -354,6 +350,11 @@ dropoff_weight_matrix = np.array([
     [0   , 0.1 , 0.2 , 0.3 , 0.43, 0.48, 0.53, 0.48, 0.43, 0.3 , 0.2 , 0.1 , 0   ]
 ])
 
+# Computes the FFT kernels' spectra before the first turn
+for kernel in (longterm_kernel, neighbor_kernel, inspiration_kernel, shortterm_kernel,
+               enemy_kernel):
+    correlate(np.zeros((game_map.height, game_map.width)), kernel)
+
 immune_timer = defaultdict(int)
 
 game.ready("Xyzrr")
@@ -367,39 +368,49 @@ while True:
     game.update_frame()
     me = game.me
     game_map = game.game_map
+    for ship_id in game.ship_registry.destroyed[me.id]:
+        immune_timer.pop(ship_id, None)
 
-    halite_matrix = build_halite_matrix()
+    halite_matrix = game_map.halite
     neighbor_matrix = np.zeros((game_map.height, game_map.width))
     enemy_matrix = build_enemy_matrix()
-    total_halite = np.sum(halite_matrix)
-    average_halite = total_halite/game_map.width**2
+    average_halite = game_map.average_halite
+    longterm_fields = {}
+    shortterm_fields = {}
+    neighbor_field = np.zeros((game_map.height, game_map.width))
+    enemy_field = correlate(enemy_matrix, enemy_kernel)
+    inspired = game_map.inspired(me.id)
+    inspiration_field = correlate(enemy_matrix, inspiration_kernel)
     planned_moves = {}
-    move_scores = defaultdict(lambda: defaultdict(dict))
     manage_immune_timer()
 
-    command_queue = []
+    ship_ids = me.fleet.ids.tolist()
+    dest_x = (me.fleet.x[:, None] + DX) % game_map.width
+    dest_y = (me.fleet.y[:, None] + DY) % game_map.height
+    immune = np.array([immune_timer[ship_id] > 0 for ship_id in ship_ids], dtype=bool)
+    past_positions = np.array([(past_pos[ship_id].x, past_pos[ship_id].y) if ship_id in past_pos else (-1, -1)
+                               for ship_id in ship_ids], dtype=int).reshape(-1, 2)
+    move_scores = np.full((len(ship_ids), 5, len(COMPONENTS)), np.nan)
+    move_totals = np.full((len(ship_ids), 5), np.nan)
 
     save_for_dropoff = False
     for ship in sorted(me.get_ships(), key=lambda s:s.halite_amount + game_map[s.position].halite_amount, reverse=True):
         if should_convert_to_dropoff(ship):
             planned_moves[ship.id] = CONSTRUCT
-    
-    st = time.process_time()
-    compute_scores()
-    debug.log("Computing scores: {}".format(time.process_time() - st))
 
-    debug.print_ship_statuses(me.get_ships(), move_scores)
-
-    st = time.process_time()
-    resolve_collisions()
-    debug.log("Collisions: {}".format(time.process_time() - st))
+    scheduler = game.anytime_scheduler(fallback=({ship.id: Direction.Still for ship in me.get_ships()}, False))
+    scheduler.add(plan_turn())
+    moves, spawn = scheduler.run()
+    if scheduler.timed_out:
+        debug.log("Out of time, sending the best moves found so far")
 
     for ship in me.get_ships():
-        if planned_moves[ship.id] == CONSTRUCT:
-            command_queue.append(ship.make_dropoff())
+        if moves[ship.id] == CONSTRUCT:
+            game.command_buffer.construct(ship.id)
         else:
-            command_queue.append(ship.move(planned_moves[ship.id]))
+            game.command_buffer.move(ship.id, Direction.to_code(moves[ship.id]))
 
-    consider_spawning()
+    if spawn:
+        game.command_buffer.spawn()
 
-    game.end_turn(command_queue)
+    game.end_turn()
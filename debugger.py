@@ -1,17 +1,31 @@
 import logging
+import struct
+from collections import namedtuple
+
+import numpy as np
+
 from hlt.positionals import Direction
 
 
 class Debugger:
     DEBUG = 1
+    TRACE = 0
 
     def __init__(self):
         self.indent = 0
 
-    def log(self, s):
-        logging.info('\t' * self.indent + str(s))
+    def log(self, s, *args):
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info('\t' * self.indent + str(s), *args)
 
     def print_ship_statuses(self, ships, move_scores):
+        """
+        :param ships: The ships scored
+        :param move_scores: Nested move_scores[ship id][direction][component] dicts
+        """
+        if self.DEBUG == 0 or not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+
         for ship in sorted(ships, key=lambda s: s.id):
             self.print_ship_status(ship, move_scores)
 
@@ -28,19 +42,156 @@ class Debugger:
         if len(move_scores[ship.id]) == 0:
             return
 
-        scores = {ok: {k: int(v) for k, v in ov.items()} for ok, ov in move_scores[ship.id].items()}
-        total_scores = {k: sum(v.values()) for k, v in scores.items()}
-        s = "       {:>7}         ".format(total_scores[Direction.North])
+        components = sorted({component for score in move_scores[ship.id].values() for component in score})
+        scores = np.array([[int(move_scores[ship.id][direction].get(component, 0)) for component in components]
+                           for direction in TRACE_DIRECTIONS])
+        self.print_move_score_table(scores, components, interests)
+
+    def print_score_tables(self, ship_ids, scores, components):
+        """
+        Array version of print_ship_statuses.
+        :param ship_ids: The ids of the ships scored
+        :param scores: A ships x directions x components array of scores, NaN where not scored
+        :param components: The names of the components
+        """
+        if self.DEBUG == 0 or not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+
+        for row in np.argsort(ship_ids, kind='stable'):
+            self.log("Ship {}:".format(ship_ids[row]))
+            self.indent += 1
+            self.print_move_score_table(scores[row], components)
+            self.indent -= 1
+
+    def print_move_score_table(self, scores, components, interests=['immediate', 'longterm', 'neighbor', 'dropoff', 'enemy', 'inspiration']):
+        """
+        :param scores: A directions x components array of one ship's scores, NaN where not scored
+        :param components: The names of the components
+        """
+        if self.DEBUG == 0:
+            return
+
+        if np.isnan(scores).all():
+            return
+
+        north, south, east, west, still = range(len(TRACE_DIRECTIONS))
+        scores = np.where(np.isnan(scores), 0, scores).astype(int)
+        total_scores = scores.sum(axis=1)
+        scores = {interest: scores[:, components.index(interest)] for interest in interests}
+        s = "       {:>7}         ".format(total_scores[north])
         for interest in interests:
-            s += "       {:>7}       ".format(scores[Direction.North][interest])
+            s += "       {:>7}       ".format(scores[interest][north])
         self.log(s)
 
-        s = "{:>7}{:>7}{:>7}  ".format(total_scores[Direction.West], total_scores[Direction.Still], total_scores[Direction.East])
+        s = "{:>7}{:>7}{:>7}  ".format(total_scores[west], total_scores[still], total_scores[east])
         for interest in interests:
-            s += "{:>7}{:>7}{:>7}".format(scores[Direction.West][interest], scores[Direction.Still][interest], scores[Direction.East][interest])
+            s += "{:>7}{:>7}{:>7}".format(scores[interest][west], scores[interest][still], scores[interest][east])
         self.log(s)
 
-        s = "       {:>7}         ".format(total_scores[Direction.South])
+        s = "       {:>7}         ".format(total_scores[south])
         for interest in interests:
-            s += ("       {:>7}       ".format(scores[Direction.South][interest]))
-        self.log(s)
\ No newline at end of file
+            s += ("       {:>7}       ".format(scores[interest][south]))
+        self.log(s)
+
+"""Direction codes stored in a trace, in the order of commands.DIRECTIONS. Constructs are stored as -1."""
+TRACE_DIRECTIONS = [Direction.North, Direction.South, Direction.East, Direction.West, Direction.Still]
+TRACE_CONSTRUCT = -1
+
+_TRACE_MAGIC = b'HTRC'
+_TRACE_HEADER = struct.Struct('<4sII')
+_TURN_HEADER = struct.Struct('<ii')
+
+"""
+One turn of a trace. scores is a ships x directions x components float32 array,
+with NaN for components that were not scored; chosen and final hold the direction
+codes picked before and after collision resolution.
+"""
+TraceTurn = namedtuple('TraceTurn', ['turn', 'ship_ids', 'scores', 'chosen', 'final'])
+
+
+class TraceRecorder:
+    """
+    Appends each turn's move score breakdown to a compact binary file.
+
+    A recorder created without a filename is disabled and ignores everything it
+    is given. Check enabled before building anything only the trace needs.
+    """
+    def __init__(self, filename, components):
+        """
+        :param filename: The trace file to create, or None to disable recording
+        :param components: The names of the score components, in the order they are stored
+        """
+        self.components = list(components)
+        self.enabled = filename is not None
+        self._file = None
+        if self.enabled:
+            names = '\n'.join(self.components).encode()
+            self._file = open(filename, 'wb')
+            self._file.write(_TRACE_HEADER.pack(_TRACE_MAGIC, len(self.components), len(names)))
+            self._file.write(names + b'\0' * (-len(names) % 4))
+
+    def record(self, turn, ship_ids, scores, chosen, final):
+        """
+        Appends one turn.
+        :param turn: The turn number
+        :param ship_ids: The ids of the ships scored
+        :param scores: A ships x directions x components array of scores
+        :param chosen: The direction code each ship chose before collision resolution
+        :param final: The direction code each ship was sent
+        """
+        if not self.enabled:
+            return
+
+        ship_ids = np.asarray(ship_ids, dtype=np.int32)
+        moves = np.concatenate([np.asarray(chosen, dtype=np.int8), np.asarray(final, dtype=np.int8)])
+        self._file.write(b''.join([
+            _TURN_HEADER.pack(turn, len(ship_ids)),
+            ship_ids.tobytes(),
+            np.asarray(scores, dtype=np.float32).tobytes(),
+            moves.tobytes(),
+            b'\0' * (-len(moves) % 4),
+        ]))
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def trace_code(move):
+    """
+    :param move: A direction or commands.CONSTRUCT
+    :return: The code a trace stores for the move
+    """
+    return TRACE_DIRECTIONS.index(move) if move in TRACE_DIRECTIONS else TRACE_CONSTRUCT
+
+
+def load_trace(filename):
+    """
+    Memory-maps a trace written by TraceRecorder.
+    :param filename: The trace file
+    :return: The component names and a list of TraceTurn whose arrays are read-only views into the file
+    """
+    data = np.memmap(filename, dtype=np.uint8, mode='r')
+    magic, num_components, names_length = _TRACE_HEADER.unpack_from(data, 0)
+    if magic != _TRACE_MAGIC:
+        raise ValueError("{} is not a trace file".format(filename))
+    offset = _TRACE_HEADER.size
+    components = bytes(data[offset:offset + names_length]).decode().split('\n') if names_length else []
+    offset += names_length + (-names_length % 4)
+
+    turns = []
+    while offset < len(data):
+        turn, num_ships = _TURN_HEADER.unpack_from(data, offset)
+        offset += _TURN_HEADER.size
+        ship_ids = data[offset:offset + 4 * num_ships].view(np.int32)
+        offset += 4 * num_ships
+        size = 4 * num_ships * len(TRACE_DIRECTIONS) * num_components
+        scores = data[offset:offset + size].view(np.float32).reshape(num_ships, len(TRACE_DIRECTIONS),
+                                                                      num_components)
+        offset += size
+        moves = data[offset:offset + 2 * num_ships].view(np.int8)
+        offset += 2 * num_ships + (-2 * num_ships % 4)
+        turns.append(TraceTurn(turn, ship_ids, scores, moves[:num_ships], moves[num_ships:]))
+    return components, turns
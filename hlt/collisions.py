@@ -0,0 +1,189 @@
+import heapq
+
+import numpy as np
+
+
+def assign_moves(scores, destinations, shared=None):
+    """
+    Picks one move per ship so that no two ships end up on the same cell and the
+    total score is as high as possible.
+
+    This is a min-cost assignment over the sparse graph of ships and the cells their
+    moves lead to. Ships that cannot reach a common cell, even through other ships,
+    are solved separately, and ships with nothing to contend for simply take their best move.
+    :param scores: A ships x moves array of scores, NaN or -inf for moves that are not allowed.
+        Some choice of allowed moves must put every ship on a different cell, for example
+        all ships staying still, or a ValueError is raised.
+    :param destinations: A ships x moves integer array of the flat cell index each move leads to
+    :param shared: Optionally, a boolean array over flat cell indices marking cells any
+        number of ships may move onto
+    :return: The chosen move index of each ship, and the total score of the assignment
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    num_ships, num_moves = scores.shape
+    allowed = np.isfinite(scores)
+    cells = np.array(destinations, dtype=np.int64)
+    if shared is not None:
+        # Each ship gets its own copy of a shared cell, so it can never be contended
+        private = shared[cells]
+        cells[private] = -1 - np.flatnonzero(private.ravel())
+
+    moves = np.full(num_ships, -1, dtype=np.int64)
+    for ships in _components(cells, allowed):
+        if len(ships) == 1:
+            ship = ships[0]
+            moves[ship] = np.argmax(np.where(allowed[ship], scores[ship], -np.inf))
+        else:
+            for ship, move in _assign_component(ships, scores, cells, allowed).items():
+                moves[ship] = move
+
+    if (moves < 0).any() or not allowed[np.arange(num_ships), moves].all():
+        raise ValueError("Some ship has no cell left to move to")
+    return moves, float(scores[np.arange(num_ships), moves].sum())
+
+
+def _components(cells, allowed):
+    """
+    :return: Lists of ships that are connected through cells their allowed moves share
+    """
+    parent = list(range(len(cells)))
+
+    def find(ship):
+        while parent[ship] != ship:
+            parent[ship] = parent[parent[ship]]
+            ship = parent[ship]
+        return ship
+
+    first_ship = {}
+    for ship, cell in zip(*np.nonzero(allowed)):
+        cell = int(cells[ship, cell])
+        other = first_ship.setdefault(cell, int(ship))
+        parent[find(int(ship))] = find(other)
+
+    components = {}
+    for ship in range(len(cells)):
+        components.setdefault(find(ship), []).append(ship)
+    return list(components.values())
+
+
+def _assign_component(ships, scores, cells, allowed):
+    """
+    Successive shortest paths with potentials, on costs of -score.
+    :return: A dict of ship to chosen move
+    """
+    edges = {}
+    for ship in ships:
+        options = np.flatnonzero(allowed[ship])
+        edges[ship] = [(int(cells[ship, move]), -float(scores[ship, move]), int(move)) for move in options]
+
+    # Dual feasibility (cost - ship_potential - cell_potential >= 0) starts from each ship's cheapest edge
+    ship_potential = {ship: min(cost for _, cost, _ in options) for ship, options in edges.items()}
+    cell_potential = {}
+    cell_owner = {}
+    ship_move = {}
+
+    for source in ships:
+        distance = {('ship', source): 0.}
+        previous = {}
+        finalized = []
+        heap = [(0., 0, 'ship', source)]
+        counter = 1
+        target = None
+        while heap:
+            dist, _, kind, node = heapq.heappop(heap)
+            if dist > distance[(kind, node)]:
+                continue
+            finalized.append((kind, node, dist))
+            if kind == 'cell':
+                owner = cell_owner.get(node)
+                if owner is None:
+                    target = node
+                    break
+                # Matched edges are tight, so moving the owner along costs nothing
+                if dist < distance.get(('ship', owner), np.inf):
+                    distance[('ship', owner)] = dist
+                    previous[('ship', owner)] = node
+                    heapq.heappush(heap, (dist, counter, 'ship', owner))
+                    counter += 1
+                continue
+            for cell, cost, move in edges[node]:
+                reduced = cost - ship_potential[node] - cell_potential.get(cell, 0.)
+                candidate = dist + max(reduced, 0.)
+                if candidate < distance.get(('cell', cell), np.inf):
+                    distance[('cell', cell)] = candidate
+                    previous[('cell', cell)] = (node, move)
+                    heapq.heappush(heap, (candidate, counter, 'cell', cell))
+                    counter += 1
+
+        if target is None:
+            raise ValueError("Some ship has no cell left to move to")
+
+        total = distance[('cell', target)]
+        for kind, node, dist in finalized:
+            if dist < total:
+                if kind == 'ship':
+                    ship_potential[node] += total - dist
+                else:
+                    cell_potential[node] = cell_potential.get(node, 0.) - (total - dist)
+
+        # Flip the path, giving each ship on it the cell it reached and its old cell to the ship before
+        cell = target
+        while True:
+            ship, move = previous[('cell', cell)]
+            ship_move[ship] = move
+            cell_owner[cell] = ship
+            if ship == source:
+                break
+            cell = previous[('ship', ship)]
+    return ship_move
+
+
+def resolve_conflicts(cells, targets, priorities, shared=None):
+    """
+    Makes planned moves safe by turning some of them into staying still, in time linear in the number of ships.
+
+    Only where ships end up matters, so chains of ships following each other, swaps
+    and longer rotations all go ahead untouched. When several ships move onto the same cell,
+    the one with the highest priority keeps its move. A ship staying still always keeps its
+    cell, so a ship that has to stay pushes back whichever ship was moving onto it, and so on.
+    :param cells: The flat cell index each ship is on
+    :param targets: The flat cell index each ship plans to end up on, its own cell to stay still
+    :param priorities: Each ship's priority. Ties go to the ship listed first
+    :param shared: Optionally, a boolean array over flat cell indices marking cells any
+        number of ships may move onto
+    :return: The safe targets, and how many moves were turned into staying still
+    """
+    cells = np.asarray(cells).tolist()
+    targets = np.asarray(targets).tolist()
+    priorities = np.asarray(priorities).tolist()
+    is_shared = (lambda cell: False) if shared is None else (lambda cell: bool(shared[cell]))
+
+    owner = {cell: row for row, (cell, target) in enumerate(zip(cells, targets)) if cell == target}
+    losers = []
+    for row, (cell, target) in enumerate(zip(cells, targets)):
+        if cell == target or is_shared(target):
+            continue
+        other = owner.get(target)
+        if other is None:
+            owner[target] = row
+        elif cells[other] == targets[other] or priorities[other] >= priorities[row]:
+            losers.append(row)
+        else:
+            owner[target] = row
+            losers.append(other)
+
+    downgraded = 0
+    while losers:
+        row = losers.pop()
+        cell = cells[row]
+        if targets[row] == cell:
+            continue
+        targets[row] = cell
+        downgraded += 1
+        if is_shared(cell):
+            continue
+        other = owner.get(cell)
+        owner[cell] = row
+        if other is not None and other != row and targets[other] == cell:
+            losers.append(other)
+    return np.array(targets, dtype=np.int64), downgraded
@@ -11,3 +11,80 @@ GENERATE = 'g'
 CONSTRUCT = 'c'
 MOVE = 'm'
 
+
+"""Move commands indexed by direction code, see Direction.to_code."""
+DIRECTIONS = (NORTH, SOUTH, EAST, WEST, STAY_STILL)
+
+
+class CommandBuffer:
+    """
+    Collects one turn's commands as bytes so they can be sent to the engine in a single write.
+
+    Moves are given as a ship id and a direction code, and are rendered from
+    preformatted per-direction fragments.
+    """
+    _MOVE_FORMATS = tuple("{} %d {}".format(MOVE, direction).encode() for direction in DIRECTIONS)
+    _CONSTRUCT_FORMAT = "{} %d".format(CONSTRUCT).encode()
+    _GENERATE = GENERATE.encode()
+
+    def __init__(self, strict=False):
+        """
+        :param strict: If True, raise a ValueError when a ship is given more than one command in a turn
+        """
+        self.strict = strict
+        self._commands = []
+        self._commanded = set()
+
+    def _claim(self, ship_id):
+        if self.strict:
+            if ship_id in self._commanded:
+                raise ValueError("Ship {} was already given a command this turn".format(ship_id))
+            self._commanded.add(ship_id)
+
+    def move(self, ship_id, direction_code):
+        """
+        Queues a move.
+        :param ship_id: The id of the ship to move
+        :param direction_code: The index of the direction in DIRECTIONS
+        """
+        self._claim(ship_id)
+        self._commands.append(self._MOVE_FORMATS[direction_code] % ship_id)
+
+    def construct(self, ship_id):
+        """
+        Queues converting a ship into a dropoff.
+        :param ship_id: The id of the ship to convert
+        """
+        self._claim(ship_id)
+        self._commands.append(self._CONSTRUCT_FORMAT % ship_id)
+
+    def spawn(self):
+        """
+        Queues spawning a ship at the shipyard.
+        """
+        self._claim(None)
+        self._commands.append(self._GENERATE)
+
+    def extend(self, commands):
+        """
+        Queues commands already rendered as strings, e.g. by Ship.move.
+        :param commands: An iterable of command strings
+        """
+        for command in commands:
+            if self.strict:
+                parts = command.split()
+                self._claim(int(parts[1]) if len(parts) > 1 else None)
+            self._commands.append(command.encode())
+
+    def __len__(self):
+        return len(self._commands)
+
+    def flush(self, stream):
+        """
+        Writes the queued commands to a binary stream as one line and clears the buffer.
+        :param stream: The stream to write to, e.g. sys.stdout.buffer
+        """
+        stream.write(b" ".join(self._commands) + b"\n")
+        stream.flush()
+        self._commands = []
+        self._commanded = set()
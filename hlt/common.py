@@ -1,11 +1,197 @@
+import collections
+import logging
+import sys
+
+import numpy as np
+
+"""
+A turn's worth of engine input.
+turn_number: The turn number of the frame
+players: A list of PlayerFrame, one per player, in the order the engine sent them
+cells: An (n, 3) integer array of changed cells as x, y, halite rows
+"""
+Frame = collections.namedtuple('Frame', ['turn_number', 'players', 'cells'])
+
+"""
+One player's section of a frame.
+ships: An (n, 4) integer array of id, x, y, halite rows
+dropoffs: An (n, 3) integer array of id, x, y rows
+"""
+PlayerFrame = collections.namedtuple('PlayerFrame', ['player_id', 'halite', 'ships', 'dropoffs'])
+
+
+class FrameReader:
+    """
+    Reads engine input from a binary stream in bulk.
+
+    Bytes are pulled from the stream as soon as they are available rather than
+    line by line, and each frame is tokenized into an integer array in one pass.
+    """
+    _CHUNK_SIZE = 1 << 16
+
+    def __init__(self, stream=None):
+        """
+        :param stream: A binary stream supporting read1. Defaults to sys.stdin.buffer
+        """
+        self._stream = stream if stream is not None else sys.stdin.buffer
+        self._buffer = bytearray()
+
+    def _fill(self):
+        """
+        Appends whatever bytes the stream has ready to the buffer.
+        :return: False if the stream is at EOF, True otherwise
+        """
+        chunk = self._stream.read1(self._CHUNK_SIZE)
+        if not chunk:
+            return False
+        self._buffer += chunk
+        return True
+
+    def _consume(self, num_bytes):
+        data = bytes(self._buffer[:num_bytes])
+        del self._buffer[:num_bytes]
+        return data
+
+    def _read_lines(self, num_lines):
+        """
+        Returns the raw bytes of the next num_lines lines, blocking until they have all arrived.
+        """
+        end = -1
+        for _ in range(num_lines):
+            newline = self._buffer.find(b"\n", end + 1)
+            while newline < 0:
+                if not self._fill():
+                    _exit_on_eof(EOFError("EOF when reading a line"))
+                newline = self._buffer.find(b"\n", end + 1)
+            end = newline
+        return self._consume(end + 1)
+
+    def read_line(self):
+        """
+        Reads a single line, like input() does.
+        :return: The line read, without its trailing newline
+        """
+        newline = self._buffer.find(b"\n")
+        while newline < 0:
+            if not self._fill():
+                if not self._buffer:
+                    _exit_on_eof(EOFError("EOF when reading a line"))
+                return self._consume(len(self._buffer)).decode()
+            newline = self._buffer.find(b"\n")
+        return self._consume(newline + 1)[:-1].decode()
+
+    def read_ints(self, num_lines):
+        """
+        Reads the next num_lines lines and tokenizes them into one flat integer array.
+        :param num_lines: How many lines to read
+        :return: An ndarray of every integer in those lines
+        """
+        return _tokenize(self._read_lines(num_lines))
+
+    def read_frame(self, num_players):
+        """
+        Reads one complete turn from the engine.
+
+        Everything currently buffered is tokenized at once. If the frame turns
+        out to be incomplete, more bytes are read and the buffer is tokenized again.
+        :param num_players: The number of players in the game
+        :return: A Frame
+        """
+        while True:
+            last_newline = self._buffer.rfind(b"\n")
+            if last_newline >= 0:
+                tokens = _tokenize(self._buffer[:last_newline + 1])
+                frame, num_tokens, num_lines = _split_frame(tokens, num_players)
+                if frame is not None:
+                    if num_tokens == len(tokens):
+                        self._consume(last_newline + 1)
+                    else:
+                        self._read_lines(num_lines)
+                    return frame
+            if not self._fill():
+                _exit_on_eof(EOFError("EOF when reading a line"))
+
+
+def _tokenize(data):
+    return np.fromstring(bytes(data), dtype=np.int64, sep=' ')
+
+
+def _split_frame(tokens, num_players):
+    """
+    Walks a flat token array laid out as the engine sends a frame.
+    :return: The Frame, how many tokens it spans and how many lines it spans,
+        or (None, 0, 0) if tokens ends before the frame does
+    """
+    size = len(tokens)
+    if size < 1:
+        return None, 0, 0
+    turn_number = int(tokens[0])
+    index = 1
+    num_lines = 1
+    players = []
+    for _ in range(num_players):
+        if index + 4 > size:
+            return None, 0, 0
+        player_id, num_ships, num_dropoffs, halite = tokens[index:index + 4].tolist()
+        index += 4
+        ships_end = index + 4 * num_ships
+        dropoffs_end = ships_end + 3 * num_dropoffs
+        if dropoffs_end > size:
+            return None, 0, 0
+        players.append(PlayerFrame(player_id, halite,
+                                   tokens[index:ships_end].reshape(num_ships, 4),
+                                   tokens[ships_end:dropoffs_end].reshape(num_dropoffs, 3)))
+        index = dropoffs_end
+        num_lines += 1 + num_ships + num_dropoffs
+    if index + 1 > size:
+        return None, 0, 0
+    num_cells = int(tokens[index])
+    index += 1
+    cells_end = index + 3 * num_cells
+    if cells_end > size:
+        return None, 0, 0
+    cells = tokens[index:cells_end].reshape(num_cells, 3)
+    num_lines += 1 + num_cells
+    return Frame(turn_number, players, cells), cells_end, num_lines
+
+
+def _exit_on_eof(eof):
+    logging.shutdown()
+    raise SystemExit(eof)
+
+
+_reader = None
+
+
+def _get_reader():
+    global _reader
+    if _reader is None:
+        _reader = FrameReader()
+    return _reader
+
+
 # Placed here to avoid circular imports
 def read_input():
     """
-    Reads input from stdin, shutting down logging and exiting if an EOFError occurs
+    Reads a line from stdin, shutting down logging and exiting if an EOFError occurs
     :return: input read
     """
-    try:
-        return input()
-    except EOFError as eof:
-        logging.shutdown()
-        raise SystemExit(eof)
+    return _get_reader().read_line()
+
+
+def read_ints(num_lines):
+    """
+    Reads several lines from stdin as one integer array, shutting down logging and exiting on EOF
+    :param num_lines: How many lines to read
+    :return: A flat ndarray of the integers read
+    """
+    return _get_reader().read_ints(num_lines)
+
+
+def read_frame(num_players):
+    """
+    Reads a whole turn from stdin, shutting down logging and exiting on EOF
+    :param num_players: The number of players in the game
+    :return: A Frame
+    """
+    return _get_reader().read_frame(num_players)
@@ -4,6 +4,8 @@ They come from game engine and changing them has no effect.
 They are strictly informational.
 """
 
+import numpy as np
+
 
 def load_constants(constants):
     """
@@ -65,6 +67,116 @@ def load_constants(constants):
     """An inspired ship instead spends 1/X% halite to move."""
     INSPIRED_MOVE_COST_RATIO = constants['INSPIRED_MOVE_COST_RATIO']
 
+    return GameConstants(constants)
+
+
+class GameConstants:
+    """
+    The constants of a single game as an immutable object, with the same names as the module globals.
+
+    It also carries integer lookup tables indexed by a cell's halite, so hot paths
+    can get the engine's exact amounts with one array lookup:
+    mined and inspired_mined are what a ship extracts from the cell (rounded up),
+    inspiration_bonus is the extra halite an inspired ship gains on top (truncated),
+    and move_cost and inspired_move_cost are what moving off the cell burns (truncated).
+    The tables are precomputed up to halite_limit halite. See HaliteTable for cells beyond it.
+    """
+    _KEYS = {
+        'SHIP_COST': 'NEW_ENTITY_ENERGY_COST',
+        'DROPOFF_COST': 'DROPOFF_COST',
+        'MAX_HALITE': 'MAX_ENERGY',
+        'MAX_TURNS': 'MAX_TURNS',
+        'EXTRACT_RATIO': 'EXTRACT_RATIO',
+        'MOVE_COST_RATIO': 'MOVE_COST_RATIO',
+        'INSPIRATION_ENABLED': 'INSPIRATION_ENABLED',
+        'INSPIRATION_RADIUS': 'INSPIRATION_RADIUS',
+        'INSPIRATION_SHIP_COUNT': 'INSPIRATION_SHIP_COUNT',
+        'INSPIRED_EXTRACT_RATIO': 'INSPIRED_EXTRACT_RATIO',
+        'INSPIRED_BONUS_MULTIPLIER': 'INSPIRED_BONUS_MULTIPLIER',
+        'INSPIRED_MOVE_COST_RATIO': 'INSPIRED_MOVE_COST_RATIO',
+    }
+    __slots__ = tuple(_KEYS) + ('WIDTH', 'HEIGHT', 'halite_limit', 'mined', 'inspired_mined',
+                                'inspiration_bonus', 'move_cost', 'inspired_move_cost')
+
+    def __init__(self, constants, halite_limit=None):
+        """
+        :param constants: The constants JSON given by the game engine, decoded
+        :param halite_limit: The largest cell halite the tables must cover. Defaults to the largest
+            starting cell plus the cargo of four full ships, which collisions may drop into the sea.
+        """
+        for name, key in self._KEYS.items():
+            object.__setattr__(self, name, constants[key])
+        object.__setattr__(self, 'WIDTH', constants.get('map_width'))
+        object.__setattr__(self, 'HEIGHT', constants.get('map_height'))
+
+        if halite_limit is None:
+            halite_limit = max(constants.get('MAX_CELL_PRODUCTION', 0), self.MAX_HALITE) + 4 * self.MAX_HALITE
+        object.__setattr__(self, 'halite_limit', halite_limit)
+
+        extract_ratio, inspired_extract_ratio = self.EXTRACT_RATIO, self.INSPIRED_EXTRACT_RATIO
+        bonus_multiplier = self.INSPIRED_BONUS_MULTIPLIER
+        move_cost_ratio, inspired_move_cost_ratio = self.MOVE_COST_RATIO, self.INSPIRED_MOVE_COST_RATIO
+        self._set_table('mined', lambda cells: -(-cells // extract_ratio))
+        self._set_table('inspired_mined', lambda cells: -(-cells // inspired_extract_ratio))
+        self._set_table('inspiration_bonus',
+                        lambda cells: (-(-cells // inspired_extract_ratio) * bonus_multiplier).astype(np.int64))
+        self._set_table('move_cost', lambda cells: cells // move_cost_ratio)
+        self._set_table('inspired_move_cost', lambda cells: cells // inspired_move_cost_ratio)
+
+    def _set_table(self, name, function):
+        object.__setattr__(self, name, HaliteTable(function, self.halite_limit))
+
+    def gained(self, cell_halite, cargo, inspired=False):
+        """
+        Halite a ship gains by mining for one turn, capped by its remaining space.
+        Works on scalars or arrays alike.
+        :param cell_halite: Halite in the cell the ship is on
+        :param cargo: Halite the ship already carries
+        :param inspired: Whether the ship is inspired
+        :return: The halite gained
+        """
+        if inspired:
+            gained = self.inspired_mined[cell_halite] + self.inspiration_bonus[cell_halite]
+        else:
+            gained = self.mined[cell_halite]
+        return np.minimum(gained, self.MAX_HALITE - cargo)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameConstants is immutable")
+
+
+class HaliteTable:
+    """
+    A read-only table of an integer function of a cell's halite, indexed like an array
+    with a scalar or an array of halite amounts.
+
+    Amounts up to the limit it was built for are looked up. Sunk cargo can pile up on a
+    cell without bound, so larger amounts are still answered, by evaluating the function.
+    """
+    __slots__ = ('values', '_function')
+
+    def __init__(self, function, limit):
+        """
+        :param function: Maps an integer array of halite amounts to the table's values
+        :param limit: The largest amount to precompute
+        """
+        self.values = function(np.arange(limit + 1))
+        self.values.flags.writeable = False
+        self._function = function
+
+    def __getitem__(self, halite):
+        size = len(self.values)
+        if isinstance(halite, (int, np.integer)):
+            return self.values[halite] if halite < size else self._function(np.int64(halite))
+        halite = np.asarray(halite)
+        values = self.values.take(halite, mode='clip')
+        if halite.size and halite.max() >= size:
+            values = np.where(halite >= size, self._function(halite), values)
+        return values
+
+    def __len__(self):
+        return len(self.values)
+
 
 # TODO remove once width/height are sent by server (#78)
 def set_dimensions(width, height):
@@ -0,0 +1,202 @@
+import numpy as np
+
+
+class Kernel:
+    """
+    A square weight matrix to slide over toroidal maps, as MyBot's weight matrices are.
+
+    Correlating a map with a kernel gives, for every cell at once, the weighted sum of the
+    wrapped window centred on it, i.e. np.sum(weights * window) for each cell.
+    Kernels with few non-zero weights are applied by sliding over a wrap-padded copy of the map,
+    which keeps integer inputs exact. Larger ones go through an FFT, whose spectrum is
+    computed once per map size.
+    """
+
+    """Kernels with more non-zero weights than this are applied through an FFT."""
+    shift_limit = 128
+
+    def __init__(self, weights):
+        """
+        :param weights: A (2 * radius + 1) square array, centred on the cell being scored
+        """
+        self.weights = np.array(weights, dtype=np.float64)
+        self.radius = self.weights.shape[0] // 2
+        dy, dx = np.nonzero(self.weights)
+        self._values = self.weights[dy, dx]
+        self._dy = dy - self.radius
+        self._dx = dx - self.radius
+        self._spectra = {}
+        self._offsets = {}
+
+    @staticmethod
+    def diamond(radius):
+        """
+        :param radius: The largest Manhattan distance covered
+        :return: A kernel weighting every cell within the distance by 1, e.g. to count ships in inspiration range
+        """
+        offsets = np.abs(np.arange(-radius, radius + 1))
+        return Kernel(offsets[:, None] + offsets[None, :] <= radius)
+
+    @property
+    def uses_fft(self):
+        """Whether correlate goes through an FFT for this kernel."""
+        return len(self._values) > self.shift_limit
+
+    def fold(self, shape):
+        """
+        Wraps the kernel onto a map, adding up weights that land on the same cell.
+        :param shape: The map's (height, width)
+        :return: A map-sized array holding the weight for each offset at [dy % height, dx % width]
+        """
+        folded = np.zeros(shape)
+        np.add.at(folded, (self._dy % shape[0], self._dx % shape[1]), self._values)
+        return folded
+
+    def _window_offsets(self, shape):
+        """
+        :return: For every row, the flat offsets of the rows its weights fall on, and likewise
+            the column offsets for every column. A cell's window is their sum
+        """
+        offsets = self._offsets.get(shape)
+        if offsets is None:
+            height, width = shape
+            offsets = (((np.arange(height)[:, None] + self._dy) % height) * width,
+                       (np.arange(width)[:, None] + self._dx) % width)
+            self._offsets[shape] = offsets
+        return offsets
+
+    def _spectrum(self, shape):
+        spectrum = self._spectra.get(shape)
+        if spectrum is None:
+            spectrum = np.conj(np.fft.rfft2(self.fold(shape)))
+            self._spectra[shape] = spectrum
+        return spectrum
+
+
+def correlate(matrix, kernel):
+    """
+    Computes the kernel's weighted window sum around every cell of a map, accounting for wrap-around.
+    :param matrix: A height x width array
+    :param kernel: A Kernel
+    :return: A height x width array where [y, x] is the weighted sum of the window around Position(x, y)
+    """
+    if kernel.uses_fft:
+        return np.fft.irfft2(np.fft.rfft2(matrix) * kernel._spectrum(matrix.shape), s=matrix.shape)
+
+    height, width = matrix.shape
+    radius = kernel.radius
+    padded = np.pad(matrix, radius, mode='wrap')
+    field = np.zeros(matrix.shape)
+    for value, dy, dx in zip(kernel._values.tolist(), (kernel._dy + radius).tolist(),
+                             (kernel._dx + radius).tolist()):
+        field += value * padded[dy:dy + height, dx:dx + width]
+    return field
+
+
+def correlate_at(matrix, kernel, xs, ys, layers=None):
+    """
+    Computes what correlate would give at a few cells only, which is cheaper than
+    correlating the whole map when there are fewer cells than the map has.
+    :param matrix: A height x width array, or a stack of them if layers is given
+    :param kernel: A Kernel
+    :param xs: The x coordinates of the cells, normalized
+    :param ys: Their y coordinates
+    :param layers: Optionally, which map of the stack each cell is on
+    :return: The weighted window sum around each cell
+    """
+    height, width = matrix.shape[-2:]
+    row_offsets, column_offsets = kernel._window_offsets((height, width))
+    index = row_offsets[ys] + column_offsets[xs]
+    if layers is not None:
+        index += (layers * (height * width))[:, None]
+    return matrix.take(index).dot(kernel._values)
+
+
+def scatter(field, kernel, position, amount=1.):
+    """
+    Updates a correlated field in place after one cell of the underlying map changed,
+    without correlating the whole map again.
+    :param field: A field as returned by correlate
+    :param kernel: The Kernel the field was correlated with
+    :param position: The normalized position of the cell that changed
+    :param amount: How much the cell changed by
+    :return: nothing
+    """
+    scatter_cells(field, kernel, np.array([position.x]), np.array([position.y]), np.array([amount]))
+
+
+def scatter_cells(field, kernel, xs, ys, amounts):
+    """
+    Batch version of scatter for several changed cells at once.
+    :param field: A field as returned by correlate
+    :param kernel: The Kernel the field was correlated with
+    :param xs: The x coordinates of the changed cells
+    :param ys: Their y coordinates
+    :param amounts: How much each cell changed by
+    :return: nothing
+    """
+    height, width = field.shape
+    np.add.at(field, ((ys[:, None] - kernel._dy) % height, (xs[:, None] - kernel._dx) % width),
+              amounts[:, None] * kernel._values)
+
+
+class MaintainedField:
+    """
+    A correlated field kept current as individual cells of the underlying map change.
+
+    Changes are scattered into the field when that is cheaper than correlating the whole
+    map again, and trigger a full recompute otherwise. Scattering accumulates rounding
+    differences, so the field is also recomputed every resync_interval updates. drift()
+    measures how far it is from a fresh correlation.
+    """
+
+    """
+    Changes are scattered while changes x kernel weights stays within this many times the map size.
+    Scattering adds each weight separately, which costs about as much per weight as an FFT
+    correlation of a 64x64 map costs per cell.
+    """
+    scatter_limit = .5
+
+    """Scattered updates allowed between two full recomputes."""
+    resync_interval = 50
+
+    def __init__(self, kernel, values):
+        """
+        :param kernel: The Kernel to correlate with
+        :param values: A height x width array of the map's values. It is copied
+        """
+        self.kernel = kernel
+        self.values = np.array(values, dtype=np.float64)
+        self.field = correlate(self.values, kernel)
+        self.recomputes = 0
+        self._since_recompute = 0
+
+    def update(self, xs, ys, values):
+        """
+        Brings the field up to date with some cells' new values.
+        :param xs: The x coordinates of the changed cells, each cell at most once
+        :param ys: Their y coordinates
+        :param values: Their new values
+        :return: nothing
+        """
+        deltas = values - self.values[ys, xs]
+        self.values[ys, xs] = values
+        changed = np.flatnonzero(deltas)
+        if len(changed) == 0:
+            return
+
+        self._since_recompute += 1
+        if (len(changed) * len(self.kernel._values) > self.scatter_limit * self.values.size
+                or self._since_recompute > self.resync_interval):
+            self.field = correlate(self.values, self.kernel)
+            self.recomputes += 1
+            self._since_recompute = 0
+        else:
+            scatter_cells(self.field, self.kernel, xs[changed], ys[changed], deltas[changed])
+
+    def drift(self):
+        """
+        Compares the field against a full recompute, e.g. to check it in a debugging session.
+        :return: The largest absolute difference
+        """
+        return np.abs(self.field - correlate(self.values, self.kernel)).max()
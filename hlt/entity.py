@@ -2,7 +2,6 @@ import abc
 
 from . import commands, constants
 from .positionals import Direction, Position
-from .common import read_input
 
 
 class Entity(abc.ABC):
@@ -15,14 +14,16 @@ class Entity(abc.ABC):
         self.position = position
 
     @staticmethod
-    def _generate(player_id):
+    def _generate(player_id, entity_id, x_position, y_position):
         """
-        Method which creates an entity for a specific player given input from the engine.
+        Method which creates an entity for a specific player given a row of input from the engine.
         :param player_id: The player id for the player who owns this entity
+        :param entity_id: The entity's id
+        :param x_position: The entity's x coordinate
+        :param y_position: The entity's y coordinate
         :return: An instance of Entity along with its id
         """
-        ship_id, x_position, y_position = map(int, read_input().split())
-        return ship_id, Entity(player_id, ship_id, Position(x_position, y_position))
+        return entity_id, Entity(player_id, entity_id, Position(x_position, y_position))
 
     def __repr__(self):
         return "{}(id={}, {})".format(self.__class__.__name__,
@@ -56,8 +57,6 @@ class Ship(Entity):
     """
     Ship class to house ship entities
     """
-    __ships = {}
-
     def __init__(self, owner, id, position, halite_amount):
         super().__init__(owner, id, position)
         self.halite_amount = halite_amount
@@ -88,31 +87,69 @@ class Ship(Entity):
         return "{} {} {}".format(commands.MOVE, self.id, commands.STAY_STILL)
 
     @staticmethod
-    def _generate(player_id):
+    def _generate(player_id, ship_id, x_position, y_position, halite):
         """
-        Creates an instance of a ship for a given player given the engine's input.
-        If an instance with the same ship.id has previously been generated, that instance will be returned.
+        Creates an instance of a ship for a given player given a row of the engine's input.
         :param player_id: The id of the player who owns this ship
+        :param ship_id: The ship's id
+        :param x_position: The ship's x coordinate
+        :param y_position: The ship's y coordinate
+        :param halite: The ship's cargo
         :return: The ship id and ship object
         """
-        # Read game engine input
-        ship_id, x_position, y_position, halite = map(int, read_input().split())
-
-        # Check storage to see if ship already exists
-        # If the ship exists, update its position and halite
-        if ship_id in Ship.__ships.keys():    
-            old_ship = Ship.__ships[ship_id]
-            old_ship.position = Position(x_position, y_position)
-            old_ship.halite_amount = halite
-            return ship_id, old_ship
-        else:
-            # Otherwise, create and return a new instance
-            new_ship = Ship(player_id, ship_id, Position(x_position, y_position), halite)
-            Ship.__ships[ship_id] = new_ship
-            return ship_id, new_ship
+        return ship_id, Ship(player_id, ship_id, Position(x_position, y_position), halite)
 
     def __repr__(self):
         return "{}(id={}, {}, cargo={} halite)".format(self.__class__.__name__,
                                                        self.id,
                                                        self.position,
                                                        self.halite_amount)
+
+
+class ShipRegistry:
+    """
+    Holds the Ship instances of one game, keyed by owner and ship id.
+
+    The same instance is handed out for a ship for as long as it is alive. Ships
+    missing from a frame are evicted, and the ids spawned and destroyed that turn
+    are reported per player in spawned and destroyed.
+    """
+    def __init__(self):
+        self._ships = {}
+        self._alive = {}
+        self.spawned = {}
+        self.destroyed = {}
+
+    def get(self, player_id, ship_id, x_position, y_position, halite):
+        """
+        Returns the instance for a ship, updated with its current state.
+        :param player_id: The id of the player who owns this ship
+        :param ship_id: The ship's id
+        :param x_position: The ship's x coordinate
+        :param y_position: The ship's y coordinate
+        :param halite: The ship's cargo
+        :return: The ship object
+        """
+        ship = self._ships.get((player_id, ship_id))
+        if ship is None:
+            _, ship = Ship._generate(player_id, ship_id, x_position, y_position, halite)
+            self._ships[(player_id, ship_id)] = ship
+        else:
+            ship.position = Position(x_position, y_position)
+            ship.halite_amount = halite
+        return ship
+
+    def _update(self, player_id, ship_ids):
+        """
+        Records which of a player's ships are alive this turn, evicting the ones that are not.
+        :param player_id: The id of the player
+        :param ship_ids: An iterable of the ids of the player's ships in this frame
+        :return: nothing.
+        """
+        alive = set(ship_ids)
+        previous = self._alive.get(player_id, set())
+        self.spawned[player_id] = alive - previous
+        self.destroyed[player_id] = previous - alive
+        for ship_id in self.destroyed[player_id]:
+            self._ships.pop((player_id, ship_id), None)
+        self._alive[player_id] = alive
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+class Fleet:
+    """
+    A player's ships for the current turn, stored as columns.
+
+    ids, x, y and halite are parallel integer ndarrays with one entry per ship,
+    in the order the engine sent them. They can be used directly for
+    vectorized work, e.g. matrix[fleet.y, fleet.x] = 1
+    """
+    def __init__(self, rows):
+        """
+        :param rows: An (n, 4) integer array of id, x, y, halite rows as sent by the engine
+        """
+        self.ids, self.x, self.y, self.halite = np.ascontiguousarray(rows.T)
+        self._rows = None
+
+    @staticmethod
+    def empty():
+        """
+        :return: A fleet with no ships
+        """
+        return Fleet(np.zeros((0, 4), dtype=np.int64))
+
+    def row(self, ship_id):
+        """
+        Returns the index of a ship within the columns
+        :param ship_id: The ship's id
+        :return: Its row index. Raises KeyError if the fleet has no such ship
+        """
+        if self._rows is None:
+            self._rows = {ship_id: row for row, ship_id in enumerate(self.ids.tolist())}
+        return self._rows[ship_id]
+
+    def __contains__(self, ship_id):
+        try:
+            self.row(ship_id)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.ids)
@@ -1,19 +1,66 @@
+import collections
 import queue
 
+import numpy as np
+
 from . import constants
 from .entity import Entity, Shipyard, Ship, Dropoff
 from .player import Player
 from .positionals import Direction, Position
-from .common import read_input
+from .convolution import Kernel, correlate
+from .navigation import cost_to_go
+from .padded_grid import PaddedGrid
+from .precompute import Tables
+from .spatial import SpatialIndex
+from .common import read_input, read_ints
+
+"""Marks a cell with no ship or structure in the ownership arrays."""
+NO_OWNER = -1
 
 
 class MapCell:
-    """A cell on the game map."""
-    def __init__(self, position, halite_amount):
+    """
+    A cell on the game map.
+
+    Cells are lightweight views created on demand: their halite, ship and structure
+    are read from and written to the owning GameMap's arrays.
+    """
+    def __init__(self, game_map, position):
+        self._map = game_map
         self.position = position
-        self.halite_amount = halite_amount
-        self.ship = None
-        self.structure = None
+
+    @property
+    def halite_amount(self):
+        """
+        :return: How much halite this cell holds
+        """
+        return int(self._map.halite[self.position.y, self.position.x])
+
+    @halite_amount.setter
+    def halite_amount(self, halite_amount):
+        self._map.halite[self.position.y, self.position.x] = halite_amount
+
+    @property
+    def ship(self):
+        """
+        :return: The ship on this cell, or None
+        """
+        return self._map._ship_at(self.position)
+
+    @ship.setter
+    def ship(self, ship):
+        self._map._set_ship(self.position, ship)
+
+    @property
+    def structure(self):
+        """
+        :return: The shipyard or dropoff on this cell, or None
+        """
+        return self._map._structures.get(self._map._index(self.position))
+
+    @structure.setter
+    def structure(self, structure):
+        self._map._set_structure(self.position, structure)
 
     @property
     def is_empty(self):
@@ -27,14 +74,14 @@ class MapCell:
         """
         :return: Whether this cell has any ships
         """
-        return self.ship is not None
+        return self._map.ship_owner[self.position.y, self.position.x] != NO_OWNER
 
     @property
     def has_structure(self):
         """
         :return: Whether this cell has any structures
         """
-        return self.structure is not None
+        return self._map.structure_owner[self.position.y, self.position.x] != NO_OWNER
 
     @property
     def structure_type(self):
@@ -67,11 +114,50 @@ class GameMap:
 
     Can be indexed by a position, or by a contained entity.
     Coordinates start at 0. Coordinates are normalized for you
+
+    The map's state lives in height x width integer arrays, indexed [y, x]:
+    halite holds each cell's halite, ship_owner and ship_id describe the ship
+    on each cell and structure_owner the owner of each shipyard or dropoff.
+    Empty cells hold NO_OWNER.
+
+    total_halite, row_halite (one sum per y) and column_halite (one sum per x) are
+    kept up to date from the cells the engine reports as changed. The last frame's
+    changed cells stay available as changed_cells, an (n, 3) array of x, y, halite rows.
+
+    For local queries, padded_halite and padded_enemies are PaddedGrids of the
+    halite and of the cells holding another player's ship, refreshed each turn.
+    padded_neighbors is cleared each turn for a bot to mark its own ships' plans in.
+    padded_enemies and padded_neighbors are only built once first used.
     """
-    def __init__(self, cells, width, height):
+    def __init__(self, halite, width, height):
         self.width = width
         self.height = height
-        self._cells = cells
+        self.halite = halite
+        Position._allocate_table(width, height)
+        self.ship_owner = np.full((height, width), NO_OWNER, dtype=np.int32)
+        self.ship_id = np.full((height, width), NO_OWNER, dtype=np.int32)
+        self.structure_owner = np.full((height, width), NO_OWNER, dtype=np.int32)
+        self._ships = {}
+        self._structures = {}
+        self._fleet_cells = []
+        self._players = {}
+        self.tables = None
+        self._distance_fields = collections.OrderedDict()
+        self._costs_to_go = {}
+        self._inspiration_kernel = None
+        self._opponent_counts = {}
+        self._ship_indices = {}
+        self.changed_cells = np.zeros((0, 3), dtype=np.int64)
+        self.row_halite = halite.sum(axis=1)
+        self.column_halite = halite.sum(axis=0)
+        self.total_halite = int(self.row_halite.sum())
+        self._padding = max(width, height) // 2
+        self.padded_halite = PaddedGrid(width, height, self._padding, dtype=halite.dtype)
+        self.padded_halite.refresh(halite)
+        self._padded_enemies = None
+        self._padded_neighbors = None
+        self._enemies_stale = True
+        self._player_id = None
 
     def __getitem__(self, location):
         """
@@ -80,12 +166,102 @@ class GameMap:
         :return: the contents housing that cell or entity
         """
         if isinstance(location, Position):
-            location = self.normalize(location)
-            return self._cells[location.y][location.x]
+            return MapCell(self, self.normalize(location))
         elif isinstance(location, Entity):
-            return self._cells[location.position.y][location.position.x]
+            return MapCell(self, location.position)
         return None
 
+    def _index(self, position):
+        return position.y * self.width + position.x
+
+    def _set_ship(self, position, ship):
+        index = self._index(position)
+        if ship is None:
+            self._ships.pop(index, None)
+            self.ship_owner[position.y, position.x] = NO_OWNER
+            self.ship_id[position.y, position.x] = NO_OWNER
+        else:
+            self._ships[index] = ship
+            self.ship_owner[position.y, position.x] = ship.owner
+            self.ship_id[position.y, position.x] = ship.id
+
+    def _ship_at(self, position):
+        ship = self._ships.get(self._index(position))
+        if ship is None:
+            owner = self.ship_owner[position.y, position.x]
+            if owner != NO_OWNER:
+                ship = self._players[owner].get_ship(int(self.ship_id[position.y, position.x]))
+        return ship
+
+    def _place_fleet(self, player_id, fleet):
+        """
+        Marks the cells under a player's ships as occupied
+        :param player_id: The id of the player owning the fleet
+        :param fleet: The player's Fleet
+        :return: nothing
+        """
+        self.ship_owner[fleet.y, fleet.x] = player_id
+        self.ship_id[fleet.y, fleet.x] = fleet.ids
+        self._fleet_cells.append(fleet.y * self.width + fleet.x)
+
+    def _register_structure(self, structure):
+        """
+        Records a shipyard or dropoff on the map. Structures never move, so this happens once per structure.
+        :param structure: The structure to record
+        :return: nothing
+        """
+        self._set_structure(structure.position, structure)
+
+    def _set_structure(self, position, structure):
+        index = self._index(position)
+        if structure is None:
+            self._structures.pop(index, None)
+            self.structure_owner[position.y, position.x] = NO_OWNER
+        else:
+            self._structures[index] = structure
+            self.structure_owner[position.y, position.x] = structure.owner
+
+    @property
+    def average_halite(self):
+        """
+        :return: The mean halite per cell
+        """
+        return self.total_halite / (self.width * self.height)
+
+    def _refresh_grids(self, player_id):
+        """
+        Brings the padded grids up to date once the turn's ships have been placed
+        :param player_id: The id of the player whose opponents count as enemies
+        :return: nothing
+        """
+        self.padded_halite.refresh(self.halite)
+        self._player_id = player_id
+        self._enemies_stale = True
+        if self._padded_neighbors is not None:
+            self._padded_neighbors.clear()
+
+    @property
+    def padded_enemies(self):
+        """
+        The grid is filled on first use each turn, so read it before marking cells unsafe.
+        :return: A PaddedGrid holding 1 on every cell with another player's ship
+        """
+        if self._padded_enemies is None:
+            self._padded_enemies = PaddedGrid(self.width, self.height, self._padding, dtype=np.int32)
+        if self._enemies_stale:
+            self._padded_enemies.refresh((self.ship_owner != NO_OWNER) & (self.ship_owner != self._player_id))
+            self._enemies_stale = False
+        return self._padded_enemies
+
+    @property
+    def padded_neighbors(self):
+        """
+        :return: A PaddedGrid, zeroed each turn, for a bot to mark its own ships' plans in
+        """
+        if self._padded_neighbors is None:
+            self._padded_neighbors = PaddedGrid(self.width, self.height, self._padding, dtype=np.int32)
+        return self._padded_neighbors
+
     def calculate_distance(self, source, target):
         """
         Compute the Manhattan distance between two locations.
@@ -94,11 +270,134 @@ class GameMap:
         :param target: The target to where calculate
         :return: The distance between these items
         """
-        source = self.normalize(source)
-        target = self.normalize(target)
-        resulting_position = abs(source - target)
-        return min(resulting_position.x, self.width - resulting_position.x) + \
-            min(resulting_position.y, self.height - resulting_position.y)
+        dx = abs(source.x % self.width - target.x % self.width)
+        dy = abs(source.y % self.height - target.y % self.height)
+        return min(dx, self.width - dx) + min(dy, self.height - dy)
+
+    """How many distance fields distance_field keeps before evicting the least recently used."""
+    distance_field_cache_size = 256
+
+    def _get_tables(self):
+        if self.tables is None:
+            self.tables = Tables(self.width, self.height)
+        return self.tables
+
+    def _distance_kernel(self):
+        return self._get_tables().distance_kernel
+
+    def distance_field(self, position):
+        """
+        Compute the Manhattan distance from a location to every cell, accounting for wrap-around.
+        Fields are cached, so the result is read-only.
+        :param position: The source position
+        :return: A height x width array where [y, x] is the distance to Position(x, y)
+        """
+        position = self.normalize(position)
+        field = self._distance_fields.get(position)
+        if field is None:
+            field = np.roll(self._distance_kernel(), (position.y, position.x), axis=(0, 1))
+            field.flags.writeable = False
+            self._distance_fields[position] = field
+            if len(self._distance_fields) > self.distance_field_cache_size:
+                self._distance_fields.popitem(last=False)
+        else:
+            self._distance_fields.move_to_end(position)
+        return field
+
+    def distance_fields(self, positions):
+        """
+        Batch version of distance_field for many sources at once. The result is not cached.
+        :param positions: The source positions
+        :return: An n x height x width array, one distance field per position
+        """
+        xs = np.array([position.x for position in positions], dtype=np.intp)
+        ys = np.array([position.y for position in positions], dtype=np.intp)
+        rows = (np.arange(self.height)[None, :] - ys[:, None]) % self.height
+        cols = (np.arange(self.width)[None, :] - xs[:, None]) % self.width
+        return self._distance_kernel()[rows[:, :, None], cols[:, None, :]]
+
+    def cost_to_go(self, targets, step_cost=None):
+        """
+        Compute the cheapest route from every cell to the nearest of some targets, weighing each move
+        by the halite it burns and then by turns. Fields are cached until the next turn, so treat
+        the result as read-only.
+        :param targets: The positions to route to, e.g. a player's shipyard and dropoffs
+        :param step_cost: A height x width array of what moving off each cell burns. Defaults to
+            the uninspired cost at the current halite, as constants.MOVE_COST_RATIO dictates
+        :return: A CostToGo with cost, turns and next_move grids
+        """
+        targets = frozenset(self.normalize(target) for target in targets)
+        if step_cost is not None:
+            return self._solve_cost_to_go(targets, step_cost)
+        field = self._costs_to_go.get(targets)
+        if field is None:
+            field = self._solve_cost_to_go(targets, self.halite // constants.MOVE_COST_RATIO)
+            self._costs_to_go[targets] = field
+        return field
+
+    def _solve_cost_to_go(self, targets, step_cost):
+        indices = np.array([self._index(target) for target in targets], dtype=np.intp)
+        return cost_to_go(self._get_tables().neighbors, step_cost, indices)
+
+    def opponent_ship_counts(self, player_id):
+        """
+        Counts, for every cell, the ships of other players within constants.INSPIRATION_RADIUS.
+        Counts for every player are computed together once per turn, so treat the result as read-only.
+        :param player_id: The player whose opponents are counted
+        :return: A height x width integer array
+        """
+        if not self._opponent_counts:
+            self._count_ships_in_inspiration_range()
+        return self._opponent_counts[player_id]
+
+    def inspired(self, player_id):
+        """
+        Works out, for every cell, whether a ship of the player there would be inspired.
+        :param player_id: The player the ship would belong to
+        :return: A height x width boolean array
+        """
+        if not constants.INSPIRATION_ENABLED:
+            return np.zeros((self.height, self.width), dtype=bool)
+        return self.opponent_ship_counts(player_id) >= constants.INSPIRATION_SHIP_COUNT
+
+    def _count_ships_in_inspiration_range(self):
+        if self._inspiration_kernel is None:
+            self._inspiration_kernel = Kernel.diamond(constants.INSPIRATION_RADIUS)
+
+        # One diamond per player, counting its own ships. Everyone else's counts are the total less that
+        counts = {}
+        for player_id, player in self._players.items():
+            ships = np.zeros((self.height, self.width))
+            ships[player.fleet.y, player.fleet.x] = 1
+            counts[player_id] = np.rint(correlate(ships, self._inspiration_kernel)).astype(np.int64)
+        total = sum(counts.values())
+        for player_id, own in counts.items():
+            self._opponent_counts[player_id] = total - own
+
+    def friendly_index(self, player_id):
+        """
+        Indexes a player's ships for proximity queries. Indices are rebuilt once per turn.
+        :param player_id: The player whose ships to index
+        :return: A SpatialIndex
+        """
+        return self._ship_index(player_id, False)
+
+    def enemy_index(self, player_id):
+        """
+        Indexes the ships of every other player for proximity queries. Indices are rebuilt once per turn.
+        :param player_id: The player whose opponents' ships to index
+        :return: A SpatialIndex
+        """
+        return self._ship_index(player_id, True)
+
+    def _ship_index(self, player_id, opponents):
+        index = self._ship_indices.get((player_id, opponents))
+        if index is None:
+            players = [player for other_id, player in sorted(self._players.items())
+                       if (other_id != player_id) == opponents]
+            index = SpatialIndex.from_players(self, players)
+            self._ship_indices[(player_id, opponents)] = index
+        return index
 
     def normalize(self, position):
         """
@@ -164,6 +463,23 @@ class GameMap:
 
         return Direction.Still
 
+    def cheapest_navigate(self, ship, field):
+        """
+        Returns a singular safe move along the cheapest route home.
+
+        :param ship: The ship to move.
+        :param field: A CostToGo, as given by cost_to_go
+        :return: A direction.
+        """
+        direction = field.next_step(ship.position)
+        if direction != Direction.Still:
+            target_pos = ship.position.directional_offset(direction)
+            if not self[target_pos].is_occupied:
+                self[target_pos].mark_unsafe(ship)
+                return direction
+
+        return Direction.Still
+
     @staticmethod
     def _generate():
         """
@@ -171,26 +487,34 @@ class GameMap:
         :return: The map object
         """
         map_width, map_height = map(int, read_input().split())
-        game_map = [[None for _ in range(map_width)] for _ in range(map_height)]
-        for y_position in range(map_height):
-            cells = read_input().split()
-            for x_position in range(map_width):
-                game_map[y_position][x_position] = MapCell(Position(x_position, y_position,
-                                                                    normalize=False),
-                                                           int(cells[x_position]))
-        return GameMap(game_map, map_width, map_height)
+        halite = read_ints(map_height).reshape(map_height, map_width)
+        return GameMap(halite, map_width, map_height)
 
-    def _update(self):
+    def _update(self, cells):
         """
         Updates this map object from the input given by the game engine
+        :param cells: An (n, 3) array of x, y, halite rows for the cells that changed this turn
         :return: nothing
         """
-        # Mark cells as safe for navigation (will re-mark unsafe cells
-        # later)
-        for y in range(self.height):
-            for x in range(self.width):
-                self[Position(x, y)].ship = None
+        # Mark the cells occupied last turn as safe for navigation (will
+        # re-mark unsafe cells later)
+        occupied = self._fleet_cells
+        if self._ships:
+            occupied.append(np.fromiter(self._ships, dtype=np.intp, count=len(self._ships)))
+        if occupied:
+            occupied = np.concatenate(occupied)
+            np.put(self.ship_owner, occupied, NO_OWNER)
+            np.put(self.ship_id, occupied, NO_OWNER)
+        self._ships.clear()
+        self._fleet_cells = []
+        self._costs_to_go.clear()
+        self._opponent_counts.clear()
+        self._ship_indices.clear()
 
-        for _ in range(int(read_input())):
-            cell_x, cell_y, cell_energy = map(int, read_input().split())
-            self[Position(cell_x, cell_y)].halite_amount = cell_energy
+        self.changed_cells = cells
+        xs, ys, halite = cells.T
+        delta = halite - self.halite[ys, xs]
+        self.halite[ys, xs] = halite
+        np.add.at(self.row_halite, ys, delta)
+        np.add.at(self.column_halite, xs, delta)
+        self.total_halite += int(delta.sum())
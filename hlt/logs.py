@@ -0,0 +1,82 @@
+import logging
+import logging.handlers
+import queue
+
+"""The record format logging.basicConfig uses, kept so log files look the same in every mode."""
+LOG_FORMAT = logging.BASIC_FORMAT
+
+
+class TurnVolumeFilter(logging.Filter):
+    """
+    Lets at most a fixed number of records through per turn and drops the rest.
+    """
+    def __init__(self, max_records):
+        super().__init__()
+        self.max_records = max_records
+        self.passed = 0
+        self.dropped = 0
+
+    def filter(self, record):
+        if self.passed >= self.max_records:
+            self.dropped += 1
+            return False
+        self.passed += 1
+        return True
+
+    def new_turn(self):
+        """
+        Resets the count for a new turn.
+        :return: How many records were dropped during the previous turn
+        """
+        dropped = self.dropped
+        self.passed = 0
+        self.dropped = 0
+        return dropped
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a background thread that formats and writes them.
+
+    Unlike QueueHandler, records are queued as they are, so building the message
+    from its arguments also happens on the background thread. Arguments should
+    therefore not be mutated after they are logged. Closing the handler drains
+    the queue, which logging.shutdown() does on exit.
+    """
+    def __init__(self, *handlers):
+        super().__init__(queue.Queue())
+        self._listener = logging.handlers.QueueListener(self.queue, *handlers)
+        self._listener.start()
+
+    def prepare(self, record):
+        return record
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        super().close()
+
+
+def configure_logging(filename, level=logging.DEBUG, asynchronous=False, max_records_per_turn=None):
+    """
+    Sets up the root logger to write to a file.
+    :param filename: The log file, truncated on start
+    :param level: Records below this level are discarded before any formatting happens
+    :param asynchronous: If True, records are written by a background thread
+    :param max_records_per_turn: If given, records beyond this many per turn are dropped
+    :return: The TurnVolumeFilter in use, or None if there is no cap
+    """
+    file_handler = logging.FileHandler(filename, mode="w")
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler = DeferredQueueHandler(file_handler) if asynchronous else file_handler
+
+    volume_filter = None
+    if max_records_per_turn is not None:
+        volume_filter = TurnVolumeFilter(max_records_per_turn)
+        handler.addFilter(volume_filter)
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+    return volume_filter
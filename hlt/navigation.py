@@ -0,0 +1,63 @@
+import numpy as np
+
+from .positionals import Direction
+
+
+class CostToGo:
+    """
+    The cheapest way home from every cell of the map, for one set of targets.
+
+    All grids are height x width and indexed [y, x], like GameMap's arrays.
+    cost is the halite burned on the cheapest route to the nearest target, turns is how many
+    moves that route takes (the fewest among equally cheap routes), and next_move holds the
+    direction code of its first step, as taken by CommandBuffer.move. Targets move Still.
+    """
+    def __init__(self, cost, turns, next_move):
+        self.cost = cost
+        self.turns = turns
+        self.next_move = next_move
+
+    def next_step(self, position):
+        """
+        :param position: A normalized position
+        :return: The Direction of the first step of the cheapest route from there
+        """
+        return Direction.from_code(int(self.next_move[position.y, position.x]))
+
+
+def cost_to_go(neighbors, step_cost, targets):
+    """
+    Solves for the cheapest route from every cell to any of the targets, all at once.
+
+    Since moving burns halite from the cell being left, the cost of a cell is its own step
+    cost plus the cost of its cheapest neighbour. That is relaxed over the whole map until
+    nothing changes, which is a multi-source shortest path done a wavefront at a time.
+    :param neighbors: The (n, 5) flat neighbour indices of Tables.neighbors
+    :param step_cost: A height x width integer array of the halite burned moving off each cell
+    :param targets: Flat indices of the target cells
+    :return: A CostToGo
+    """
+    shape = step_cost.shape
+    size = step_cost.size
+    cardinals = neighbors[:, :4]
+
+    # Costs and turns are packed into one key so that a single minimum compares both,
+    # cost first. A route never takes size turns or more, so turns fit below size.
+    step = step_cost.ravel().astype(np.int64) * size + 1
+    unreachable = np.iinfo(np.int64).max // 2
+    key = np.full(size, unreachable, dtype=np.int64)
+    key[targets] = 0
+    is_target = np.zeros(size, dtype=bool)
+    is_target[targets] = True
+
+    while True:
+        relaxed = np.minimum(key, step + key[cardinals].min(axis=1))
+        if np.array_equal(relaxed, key):
+            break
+        key = relaxed
+
+    next_move = key[cardinals].argmin(axis=1)
+    next_move[is_target] = Direction.to_code(Direction.Still)
+
+    cost, turns = np.divmod(key, size)
+    return CostToGo(cost.reshape(shape), turns.reshape(shape), next_move.reshape(shape))
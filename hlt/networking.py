@@ -1,48 +1,88 @@
 import json
 import logging
 import sys
+import time
 
-from .common import read_input
+from .common import read_input, read_frame
 from . import constants
+from .commands import CommandBuffer
+from .entity import ShipRegistry
 from .game_map import GameMap, Player
+from .logs import configure_logging
+from .precompute import Tables
+from .scheduler import AnytimeScheduler
 
 
 class Game:
     """
     The game object holds all metadata pertinent to the game and all its contents
     """
-    def __init__(self):
+    """Seconds the engine allows a bot per turn."""
+    turn_time = 2.0
+
+    """Seconds of the turn kept in reserve for reading input and sending commands."""
+    time_headroom = .2
+
+    def __init__(self, log_level=logging.DEBUG, async_logging=False, max_log_records_per_turn=None):
         """
         Initiates a game object collecting all start-state instances for the contained items for pre-game.
         Also sets up basic logging.
+        :param log_level: The lowest level written to the bot's log
+        :param async_logging: If True, log records are formatted and written on a background thread
+        :param max_log_records_per_turn: If given, log records beyond this many per turn are dropped
         """
         self.turn_number = 0
+        self.turn_started = time.perf_counter()
+        self.command_buffer = CommandBuffer()
 
         # Grab constants JSON
         raw_constants = read_input()
-        constants.load_constants(json.loads(raw_constants))
+        self.constants = constants.load_constants(json.loads(raw_constants))
 
         num_players, self.my_id = map(int, read_input().split())
 
-        logging.basicConfig(
-            filename="bot-{}.log".format(self.my_id),
-            filemode="w",
-            level=logging.DEBUG,
+        self._log_filter = configure_logging(
+            "bot-{}.log".format(self.my_id),
+            level=log_level,
+            asynchronous=async_logging,
+            max_records_per_turn=max_log_records_per_turn,
         )
 
+        self.ship_registry = ShipRegistry()
         self.players = {}
         for player in range(num_players):
-            self.players[player] = Player._generate()
+            self.players[player] = Player._generate(self.ship_registry)
         self.me = self.players[self.my_id]
         self.game_map = GameMap._generate()
+        self.game_map._players = self.players
+        for player in self.players.values():
+            self.game_map._register_structure(player.shipyard)
+            player._track_dropoffs(self.game_map.distance_field)
 
         constants.set_dimensions(self.game_map.width, self.game_map.height)
+        self.tables = None
+
+    def precompute(self, radii=(), warm_up=True):
+        """
+        Builds the per-map lookup tables, using the extra time the engine allows before ready().
+        :param radii: The window radii the strategy will use
+        :param warm_up: Whether to run common NumPy code paths once so the first turn is not slowed
+        :return: The Tables, also kept as game.tables and game.game_map.tables
+        """
+        self.tables = Tables(self.game_map.width, self.game_map.height, radii)
+        self.game_map.tables = self.tables
+        if warm_up:
+            self.tables.warm_up()
+        return self.tables
 
     def ready(self, name):
         """
         Indicate that your bot is ready to play.
+        Builds the lookup tables first if precompute() has not been called.
         :param name: The name of your bot
         """
+        if self.tables is None:
+            self.precompute()
         send_commands([name])
 
     def update_frame(self):
@@ -50,32 +90,61 @@ class Game:
         Updates the game object's state.
         :returns: nothing.
         """
-        self.turn_number = int(read_input())
-        logging.info("=============== TURN {:03} ================".format(self.turn_number))
+        frame = read_frame(len(self.players))
+        self.turn_started = time.perf_counter()
+        self.turn_number = frame.turn_number
+        if self._log_filter is not None:
+            dropped = self._log_filter.new_turn()
+            if dropped:
+                logging.warning("Dropped %d log records over the per-turn limit", dropped)
+        logging.info("=============== TURN %03d ================", self.turn_number)
 
-        for _ in range(len(self.players)):
-            player, num_ships, num_dropoffs, halite = map(int, read_input().split())
-            self.players[player]._update(num_ships, num_dropoffs, halite)
+        for player, halite, ships, dropoffs in frame.players:
+            self.players[player]._update(halite, ships, dropoffs)
 
-        self.game_map._update()
+        self.game_map._update(frame.cells)
 
         # Mark cells with ships as unsafe for navigation
         for player in self.players.values():
-            for ship in player.get_ships():
-                self.game_map[ship.position].mark_unsafe(ship)
+            self.game_map._place_fleet(player.id, player.fleet)
+
+            # Structures never move, so only newly built dropoffs need registering
+            for dropoff in player._new_dropoffs:
+                self.game_map._register_structure(dropoff)
+
+        self.game_map._refresh_grids(self.my_id)
 
-            self.game_map[player.shipyard.position].structure = player.shipyard
-            for dropoff in player.get_dropoffs():
-                self.game_map[dropoff.position].structure = dropoff
+    @property
+    def deadline(self):
+        """
+        :return: The time.perf_counter() value by which this turn's commands should be sent
+        """
+        return self.turn_started + self.turn_time - self.time_headroom
+
+    def time_remaining(self):
+        """
+        :return: Seconds left until this turn's deadline
+        """
+        return self.deadline - time.perf_counter()
+
+    def anytime_scheduler(self, fallback=None):
+        """
+        Creates an AnytimeScheduler bound to this turn's deadline.
+        :param fallback: The command set to send if no stage finishes in time
+        :return: The scheduler
+        """
+        return AnytimeScheduler(self.deadline, fallback)
 
-    @staticmethod
-    def end_turn(commands):
+    def end_turn(self, commands=None):
         """
         Method to send all commands to the game engine, effectively ending your turn.
+        Anything queued in command_buffer is sent along with the given commands, in one write.
         :param commands: Array of commands to send to engine
         :return: nothing.
         """
-        send_commands(commands)
+        if commands:
+            self.command_buffer.extend(commands)
+        self.command_buffer.flush(sys.stdout.buffer)
 
 
 def send_commands(commands):
@@ -84,5 +153,5 @@ def send_commands(commands):
     :param commands: The list of commands to send.
     :return: nothing.
     """
-    print(" ".join(commands))
-    sys.stdout.flush()
+    sys.stdout.buffer.write(" ".join(commands).encode() + b"\n")
+    sys.stdout.buffer.flush()
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class PaddedGrid:
+    """
+    A map-sized grid stored with a wrapped-around border, so that the window around
+    any cell is a plain slice.
+
+    window() returns views into the grid rather than copies: they change when the grid
+    is refreshed and must not be written to. Windows up to the padding in radius are
+    available, and the padding may exceed the map size.
+    """
+    def __init__(self, width, height, padding, dtype=np.float64):
+        """
+        :param width: The map width
+        :param height: The map height
+        :param padding: The largest window radius that will be asked for
+        :param dtype: The type of the values held
+        """
+        self.width = width
+        self.height = height
+        self.padding = padding
+        rows = (np.arange(height + 2 * padding) - padding) % height
+        cols = (np.arange(width + 2 * padding) - padding) % width
+        self._rows = rows
+        self._cols = cols
+        """Flat index into the unpadded map of every padded cell, so a refresh is a single take."""
+        self._source = rows[:, None] * width + cols[None, :]
+        self.padded = np.zeros(self._source.shape, dtype=dtype)
+
+    def refresh(self, matrix):
+        """
+        Overwrites the grid, border included, in place.
+        :param matrix: A height x width array
+        :return: nothing.
+        """
+        np.take(np.asarray(matrix, dtype=self.padded.dtype), self._source, out=self.padded, mode='clip')
+
+    def clear(self):
+        """
+        Sets every cell to zero.
+        :return: nothing.
+        """
+        self.padded.fill(0)
+
+    def set(self, position, value):
+        """
+        Changes a single cell, along with its copies in the border.
+        :param position: A normalized position
+        :param value: The new value
+        :return: nothing.
+        """
+        rows = np.flatnonzero(self._rows == position.y)
+        cols = np.flatnonzero(self._cols == position.x)
+        self.padded[rows[:, None], cols] = value
+
+    def window(self, position, radius):
+        """
+        :param position: A normalized position, the centre of the window
+        :param radius: The window radius, at most the padding
+        :return: A read-only (2 * radius + 1) square view of the grid
+        """
+        if radius > self.padding:
+            raise ValueError("Window radius {} exceeds the padding of {}".format(radius, self.padding))
+        top = position.y + self.padding - radius
+        left = position.x + self.padding - radius
+        view = self.padded[top:top + 2 * radius + 1, left:left + 2 * radius + 1]
+        view.flags.writeable = False
+        return view
@@ -1,17 +1,35 @@
-from .entity import Shipyard, Ship, Dropoff
+import numpy as np
+
+from .entity import Shipyard, Ship, Dropoff, ShipRegistry
+from .fleet import Fleet
 from .positionals import Position
 from .common import read_input
 
 class Player:
     """
     Player object containing all items/metadata pertinent to the player.
+
+    The player's ships are held in fleet, a column table of NumPy arrays.
+    Ship objects are only built from it when they are asked for.
+
+    Once the game has started, dropoff_distance and nearest_dropoff are height x width
+    grids holding, for every cell, the distance to the player's closest shipyard or
+    dropoff and that structure's id. They are only recomputed when a dropoff appears.
     """
-    def __init__(self, player_id, shipyard, halite=0):
+    def __init__(self, player_id, shipyard, halite=0, registry=None):
         self.id = player_id
         self.shipyard = shipyard
         self.halite_amount = halite
+        self._registry = registry if registry is not None else ShipRegistry()
+        self.fleet = Fleet.empty()
         self._ships = {}
+        self._ship_list = None
         self._dropoffs = {}
+        self._new_dropoffs = []
+        self._distance_field = None
+        self._dropoff_grids = None
+        self.dropoff_distance = None
+        self.nearest_dropoff = None
 
     def get_ship(self, ship_id):
         """
@@ -19,13 +37,21 @@ class Player:
         :param ship_id: The ship id of the ship you wish to return
         :return: the ship object.
         """
-        return self._ships[ship_id]
+        ship = self._ships.get(ship_id)
+        if ship is None:
+            row = self.fleet.row(ship_id)
+            ship = self._registry.get(self.id, ship_id, int(self.fleet.x[row]), int(self.fleet.y[row]),
+                                      int(self.fleet.halite[row]))
+            self._ships[ship_id] = ship
+        return ship
 
     def get_ships(self):
         """
         :return: Returns all ship objects in a list
         """
-        return list(self._ships.values())
+        if self._ship_list is None:
+            self._ship_list = [self.get_ship(ship_id) for ship_id in self.fleet.ids.tolist()]
+        return list(self._ship_list)
 
     def get_dropoff(self, dropoff_id):
         """
@@ -51,26 +77,82 @@ class Player:
         :param ship_id: The ID to check.
         :return: True if and only if the ship exists.
         """
-        return ship_id in self._ships
+        return ship_id in self.fleet
+
+
+    def plan_dropoff(self, dropoff):
+        """
+        Counts a dropoff the player intends to build as if it existed, for the rest of this turn.
+        :param dropoff: The planned dropoff
+        :return: nothing.
+        """
+        self._dropoffs[dropoff.id] = dropoff
+        if self._dropoff_grids is None:
+            return
+        if self.dropoff_distance is self._dropoff_grids[0]:
+            self.dropoff_distance = self.dropoff_distance.copy()
+            self.nearest_dropoff = self.nearest_dropoff.copy()
+        self._add_to_dropoff_grids(self.dropoff_distance, self.nearest_dropoff, dropoff)
 
+    def _track_dropoffs(self, distance_field):
+        """
+        Starts maintaining the nearest-dropoff grids.
+        :param distance_field: A function returning the distance field of a position, such as GameMap.distance_field
+        :return: nothing.
+        """
+        self._distance_field = distance_field
+        distances = distance_field(self.shipyard.position).copy()
+        nearest = np.full(distances.shape, self.shipyard.id, dtype=np.int32)
+        for dropoff in self._dropoffs.values():
+            self._add_to_dropoff_grids(distances, nearest, dropoff)
+        self._dropoff_grids = distances, nearest
+        self.dropoff_distance, self.nearest_dropoff = self._dropoff_grids
+
+    def _add_to_dropoff_grids(self, distances, nearest, structure):
+        field = self._distance_field(structure.position)
+        closer = field < distances
+        distances[closer] = field[closer]
+        nearest[closer] = structure.id
 
     @staticmethod
-    def _generate():
+    def _generate(registry=None):
         """
         Creates a player object from the input given by the game engine
+        :param registry: The game's ShipRegistry
         :return: The player object
         """
         player, shipyard_x, shipyard_y = map(int, read_input().split())
-        return Player(player, Shipyard(player, -1, Position(shipyard_x, shipyard_y, normalize=False)))
+        return Player(player, Shipyard(player, -1, Position(shipyard_x, shipyard_y, normalize=False)),
+                      registry=registry)
 
-    def _update(self, num_ships, num_dropoffs, halite):
+    def _update(self, halite, ships, dropoffs):
         """
         Updates this player object considering the input from the game engine for the current specific turn.
-        :param num_ships: The number of ships this player has this turn
-        :param num_dropoffs: The number of dropoffs this player has this turn
         :param halite: How much halite the player has in total
+        :param ships: An (n, 4) array of id, x, y, halite rows for this player's ships
+        :param dropoffs: An (n, 3) array of id, x, y rows for this player's dropoffs
         :return: nothing.
         """
         self.halite_amount = halite
-        self._ships = {id: ship for (id, ship) in [Ship._generate(self.id) for _ in range(num_ships)]}
-        self._dropoffs = {id: dropoff for (id, dropoff) in [Dropoff._generate(self.id) for _ in range(num_dropoffs)]}
+        self.fleet = Fleet(ships)
+        self._ships = {}
+        self._ship_list = None
+        self._registry._update(self.id, self.fleet.ids.tolist())
+
+        # Dropoffs never move, so keep the instances we already have and only build new ones
+        previous_dropoffs = self._dropoffs
+        self._dropoffs = {}
+        self._new_dropoffs = []
+        for dropoff_id, x_position, y_position in dropoffs.tolist():
+            if dropoff_id in previous_dropoffs:
+                self._dropoffs[dropoff_id] = previous_dropoffs[dropoff_id]
+            else:
+                dropoff_id, dropoff = Dropoff._generate(self.id, dropoff_id, x_position, y_position)
+                self._dropoffs[dropoff_id] = dropoff
+                self._new_dropoffs.append(dropoff)
+
+        # Only a new dropoff can change the nearest-dropoff grids. Also drops grids changed by plan_dropoff
+        if self._dropoff_grids is not None:
+            for dropoff in self._new_dropoffs:
+                self._add_to_dropoff_grids(*self._dropoff_grids, dropoff)
+            self.dropoff_distance, self.nearest_dropoff = self._dropoff_grids
@@ -41,6 +41,24 @@ class Direction:
         else:
             raise IndexError
 
+    @staticmethod
+    def to_code(direction):
+        """
+        Converts from this direction tuple notation to an integer code, as taken by CommandBuffer.move
+        :param direction: the direction in this notation
+        :return: The index of the direction in commands.DIRECTIONS
+        """
+        return _DIRECTION_CODES[direction]
+
+    @staticmethod
+    def from_code(code):
+        """
+        Converts from an integer code back to this direction tuple notation
+        :param code: The index of the direction in commands.DIRECTIONS
+        :return: The direction in this notation
+        """
+        return _CODE_DIRECTIONS[code]
+
     @staticmethod
     def invert(direction):
         """
@@ -62,17 +80,63 @@ class Direction:
             raise IndexError
 
 
+_CODE_DIRECTIONS = (Direction.North, Direction.South, Direction.East, Direction.West, Direction.Still)
+_DIRECTION_CODES = {direction: code for code, direction in enumerate(_CODE_DIRECTIONS)}
+
+
 class Position:
-    def __init__(self, x, y, normalize=True):
-        self.x = x
-        self.y = y
+    """
+    An immutable x, y coordinate.
 
-        if normalize:
-            self.normalize()
+    Once a map has been created, every normalized coordinate on it is backed by
+    a single preallocated instance, so building a Position is a table lookup
+    rather than an allocation.
+    """
+    __slots__ = ('x', 'y', '_hash')
+
+    _table = None
+    _width = None
+    _height = None
+
+    def __new__(cls, x, y, normalize=True):
+        table = cls._table
+        if table is not None:
+            width = cls._width
+            height = cls._height
+            if normalize:
+                return table[(y % height) * width + x % width]
+            if 0 <= x < width and 0 <= y < height:
+                return table[y * width + x]
+        elif normalize:
+            x = x % constants.WIDTH
+            y = y % constants.HEIGHT
+        return cls._allocate(x, y)
+
+    @classmethod
+    def _allocate(cls, x, y):
+        position = object.__new__(cls)
+        object.__setattr__(position, 'x', x)
+        object.__setattr__(position, 'y', y)
+        object.__setattr__(position, '_hash', hash((x, y)))
+        return position
+
+    @classmethod
+    def _allocate_table(cls, width, height):
+        """
+        Preallocates the shared instance for every cell of a width x height map.
+        :param width: The map width
+        :param height: The map height
+        :return: nothing.
+        """
+        cls._table = [cls._allocate(x, y) for y in range(height) for x in range(width)]
+        cls._width = width
+        cls._height = height
 
     def normalize(self):
-        self.x = self.x % constants.WIDTH
-        self.y = self.y % constants.HEIGHT
+        """
+        :return: This position wrapped into the bounds of the map
+        """
+        return Position(self.x, self.y)
 
     def directional_offset(self, direction):
         """
@@ -80,7 +144,7 @@ class Position:
         :param direction: the direction cardinal tuple
         :return: a new position moved in that direction
         """
-        return self + Position(*direction)
+        return Position(self.x + direction[0], self.y + direction[1])
 
     def get_surrounding_cardinals(self):
         """
@@ -94,23 +158,17 @@ class Position:
     def __sub__(self, other):
         return Position(self.x - other.x, self.y - other.y)
 
-    def __iadd__(self, other):
-        self.x += other.x
-        self.y += other.y
-        self.normalize()
-        return self
-
-    def __isub__(self, other):
-        self.x -= other.x
-        self.y -= other.y
-        self.normalize()
-        return self
-
     def __abs__(self):
         return Position(abs(self.x), abs(self.y))
 
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable")
+
+    def __reduce__(self):
+        return Position, (self.x, self.y, False)
+
     def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
+        return self is other or (self.x == other.x and self.y == other.y)
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -121,4 +179,4 @@ class Position:
                                    self.y)
 
     def __hash__(self):
-        return hash((self.x, self.y))
+        return self._hash
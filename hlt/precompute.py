@@ -0,0 +1,96 @@
+import numpy as np
+
+from .positionals import Position
+
+
+class Tables:
+    """
+    Per-map lookup tables, built once before the game starts.
+
+    All grids are height x width and indexed [y, x], like GameMap's arrays.
+    """
+    def __init__(self, width, height, radii=()):
+        """
+        :param width: The map width
+        :param height: The map height
+        :param radii: The window radii to prepare wrap indices for
+        """
+        self.width = width
+        self.height = height
+
+        x = np.arange(width)
+        y = np.arange(height)
+
+        """Wrap-aware Manhattan distance from (0, 0) to every cell. Roll it to get distances from elsewhere."""
+        self.distance_kernel = (np.minimum(y, height - y)[:, None] + np.minimum(x, width - x)[None, :])
+
+        """
+        Flat (y * width + x) index of each cell's neighbours, shape (width * height, 5),
+        in direction code order: north, south, east, west, still.
+        """
+        ys, xs = np.divmod(np.arange(width * height), width)
+        self.neighbors = np.stack([
+            ((ys - 1) % height) * width + xs,
+            ((ys + 1) % height) * width + xs,
+            ys * width + (xs + 1) % width,
+            ys * width + (xs - 1) % width,
+            ys * width + xs,
+        ], axis=1)
+
+        self._wrap_indices = {}
+        self._manhattan_windows = {}
+        for radius in radii:
+            self.wrap_indices(radius)
+
+    def wrap_indices(self, radius):
+        """
+        Returns index arrays for the (2 * radius + 1)-wide window around every row and column.
+        rows[y] holds the wrapped row indices of the window centred on row y, and likewise cols[x].
+        :param radius: The window radius
+        :return: rows, cols as (height, 2 * radius + 1) and (width, 2 * radius + 1) arrays
+        """
+        indices = self._wrap_indices.get(radius)
+        if indices is None:
+            offsets = np.arange(-radius, radius + 1)
+            indices = ((np.arange(self.height)[:, None] + offsets) % self.height,
+                       (np.arange(self.width)[:, None] + offsets) % self.width)
+            self._wrap_indices[radius] = indices
+        return indices
+
+    def window(self, matrix, position, radius):
+        """
+        Copies the wrapped window of a map-sized matrix around a position.
+        :param matrix: A height x width array
+        :param position: The centre of the window
+        :param radius: The window radius
+        :return: A (2 * radius + 1) square array
+        """
+        rows, cols = self.wrap_indices(radius)
+        return matrix[rows[position.y][:, None], cols[position.x]]
+
+    def manhattan_window(self, radius):
+        """
+        :param radius: The window radius
+        :return: A (2 * radius + 1) square array of each cell's Manhattan distance from the centre
+        """
+        window = self._manhattan_windows.get(radius)
+        if window is None:
+            offsets = np.abs(np.arange(-radius, radius + 1))
+            window = offsets[:, None] + offsets[None, :]
+            self._manhattan_windows[radius] = window
+        return window
+
+    def warm_up(self):
+        """
+        Runs the NumPy operations strategies lean on once, so the first turn does not pay
+        for their first-call setup.
+        :return: nothing.
+        """
+        grid = np.zeros((self.height, self.width))
+        for radius in self._wrap_indices:
+            window = self.window(grid, Position(0, 0), radius)
+            np.sum(np.clip(window * .5, 0, 1) ** 2 * self.manhattan_window(radius))
+        grid.take(self.neighbors)
+        np.roll(self.distance_kernel, (1, 1), axis=(0, 1))
+        np.fft.irfft2(np.fft.rfft2(grid), s=grid.shape)
+        np.unravel_index(grid.argmax(), grid.shape)
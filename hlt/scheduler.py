@@ -0,0 +1,61 @@
+import time
+
+
+class AnytimeScheduler:
+    """
+    Runs refinable strategy stages against a deadline.
+
+    A stage is a generator. Each time it yields it hands back either None, meaning
+    it made some progress, or a complete command set that supersedes the previous one.
+    The scheduler always holds the latest complete command set, starting from a
+    fallback, and returns it when the stages finish or time runs out.
+
+    Stages cannot be interrupted mid-step, so a stage is only resumed while its
+    slowest step so far still fits in the time remaining.
+    """
+    def __init__(self, deadline, fallback=None, clock=time.perf_counter):
+        """
+        :param deadline: The clock() value by which run() must return
+        :param fallback: The command set to return if no stage offers a better one in time
+        :param clock: The clock the deadline is measured against
+        """
+        self.deadline = deadline
+        self.best = fallback
+        self.timed_out = False
+        self._clock = clock
+        self._stages = []
+
+    def add(self, stage):
+        """
+        Registers a stage to run after the ones already added.
+        :param stage: A generator, as described above
+        """
+        self._stages.append(stage)
+
+    def time_remaining(self):
+        """
+        :return: Seconds left until the deadline
+        """
+        return self.deadline - self._clock()
+
+    def run(self):
+        """
+        Steps through the stages in order until they are exhausted or the deadline is near.
+        :return: The best command set held when stopping
+        """
+        for stage in self._stages:
+            slowest_step = 0.
+            while True:
+                start = self._clock()
+                if start + slowest_step > self.deadline:
+                    self.timed_out = True
+                    stage.close()
+                    return self.best
+                try:
+                    result = next(stage)
+                except StopIteration:
+                    break
+                if result is not None:
+                    self.best = result
+                slowest_step = max(slowest_step, self._clock() - start)
+        return self.best
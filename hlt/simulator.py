@@ -0,0 +1,355 @@
+import collections
+
+import numpy as np
+
+from .commands import DIRECTIONS
+from .convolution import Kernel, correlate_at
+from .game_map import NO_OWNER
+from .positionals import Direction
+
+"""Move code for converting a ship into a dropoff, after the direction codes of commands.DIRECTIONS."""
+CONSTRUCT = len(DIRECTIONS)
+
+STILL = Direction.to_code(Direction.Still)
+
+"""Offset each move code applies to a ship's x and y. Converting ships do not move."""
+_OFFSETS = np.array([Direction.from_code(code) for code in range(len(DIRECTIONS))] + [(0, 0)])
+_DX = _OFFSETS[:, 0]
+_DY = _OFFSETS[:, 1]
+
+
+class GameState:
+    """
+    A copy of the whole game that can be played forward under the engine's rules, for rollouts.
+
+    The map is held as halite and structure_owner, height x width arrays indexed [y, x]
+    like GameMap's. Ships of every player are stored as parallel columns: owners, ids, x, y,
+    halite and inspired, the latter being whether the engine will treat the ship as inspired
+    when it next mines or moves. Players are indexed by id in player_halite and in
+    shipyard_x and shipyard_y.
+
+    step() changes the state in place, so copy() it first to keep the original.
+    """
+    def __init__(self, game_constants, turn_number, halite, structure_owner, player_halite,
+                 shipyard_x, shipyard_y, owners, ids, x, y, ship_halite, next_ship_id=None):
+        """
+        :param game_constants: The GameConstants of the game
+        :param turn_number: The turn the state is at
+        :param halite: A height x width integer array of each cell's halite
+        :param structure_owner: A height x width integer array of the owner of the shipyard or
+            dropoff on each cell, NO_OWNER where there is none
+        :param player_halite: Each player's stored halite, indexed by player id
+        :param shipyard_x: The x coordinate of each player's shipyard
+        :param shipyard_y: The y coordinate of each player's shipyard
+        :param owners: The owner of each ship
+        :param ids: The id of each ship
+        :param x: The x coordinate of each ship
+        :param y: The y coordinate of each ship
+        :param ship_halite: The halite each ship carries
+        :param next_ship_id: The id the next spawned ship gets. Defaults to one past the highest id
+        """
+        self.constants = game_constants
+        self.turn_number = turn_number
+        self.halite = halite
+        self.structure_owner = structure_owner
+        self.height, self.width = halite.shape
+        self.player_halite = player_halite
+        self.shipyard_x = shipyard_x
+        self.shipyard_y = shipyard_y
+        self.owners = owners
+        self.ids = ids
+        self.x = x
+        self.y = y
+        self.ship_halite = ship_halite
+        if next_ship_id is None:
+            next_ship_id = int(ids.max()) + 1 if len(ids) else 0
+        self.next_ship_id = next_ship_id
+        self._inspiration_kernel = Kernel.diamond(game_constants.INSPIRATION_RADIUS)
+        self.inspired = self._find_inspired()
+
+    @staticmethod
+    def from_game(game):
+        """
+        Takes a snapshot of the game as of the last frame read.
+        :param game: The Game
+        :return: A GameState
+        """
+        players = [game.players[player_id] for player_id in sorted(game.players)]
+        fleets = [player.fleet for player in players]
+        empty = [np.zeros(0, dtype=np.int64)]
+        return GameState(
+            game.constants, game.turn_number, game.game_map.halite.copy(),
+            game.game_map.structure_owner.copy(),
+            np.array([player.halite_amount for player in players], dtype=np.int64),
+            np.array([player.shipyard.position.x for player in players], dtype=np.int64),
+            np.array([player.shipyard.position.y for player in players], dtype=np.int64),
+            np.concatenate([np.full(len(fleet), player.id, dtype=np.int64)
+                            for player, fleet in zip(players, fleets)] + empty),
+            np.concatenate([fleet.ids for fleet in fleets] + empty),
+            np.concatenate([fleet.x for fleet in fleets] + empty),
+            np.concatenate([fleet.y for fleet in fleets] + empty),
+            np.concatenate([fleet.halite for fleet in fleets] + empty),
+        )
+
+    def copy(self):
+        """
+        :return: An independent copy of this state
+        """
+        state = GameState.__new__(GameState)
+        state.__dict__.update(self.__dict__)
+        for name in ('halite', 'structure_owner', 'player_halite', 'owners', 'ids',
+                     'x', 'y', 'ship_halite', 'inspired'):
+            setattr(state, name, getattr(self, name).copy())
+        return state
+
+    @property
+    def num_players(self):
+        """
+        :return: How many players are in the game
+        """
+        return len(self.player_halite)
+
+    def is_over(self):
+        """
+        :return: Whether the last turn of the game has been played
+        """
+        return self.turn_number > self.constants.MAX_TURNS
+
+    def scores(self):
+        """
+        The final score of a player is the halite it has stored, so this is also
+        the score each player would end on if the game stopped now.
+        :return: Each player's stored halite, indexed by player id
+        """
+        return self.player_halite.copy()
+
+    def step(self, moves, spawns=()):
+        """
+        Plays one turn, in the order the engine resolves it: dropoffs are built, ships move
+        and new ships appear, ships sharing a cell are destroyed, ships that stayed mine,
+        ships on their owner's structures deposit, and inspiration is updated.
+
+        Commands the engine would reject are ignored rather than failing: ships without
+        the halite to move stay where they are, and dropoffs and ships a player cannot
+        afford, or dropoffs on a cell with a structure, are not built.
+        :param moves: The move code of each ship, in the order of the ship columns: a direction
+            code as taken by CommandBuffer.move, or CONSTRUCT
+        :param spawns: The ids of the players spawning a ship
+        :return: nothing.
+        """
+        game_constants = self.constants
+        moves = np.array(moves, dtype=np.intp)
+        width, height = self.width, self.height
+        x, y, cargo = self.x, self.y, self.ship_halite
+        cell_halite = self.halite[y, x]
+
+        converting = moves == CONSTRUCT
+        if converting.any():
+            self._construct(np.flatnonzero(converting), moves, cell_halite)
+            converting = moves == CONSTRUCT
+
+        move_cost = np.where(self.inspired, game_constants.inspired_move_cost[cell_halite],
+                             game_constants.move_cost[cell_halite])
+        moves[(moves < STILL) & (move_cost > cargo)] = STILL
+        moving = moves < STILL
+        cargo = cargo - np.where(moving, move_cost, 0)
+        x = (x + _DX[moves]) % width
+        y = (y + _DY[moves]) % height
+        mining = moves == STILL
+
+        kept = ~converting
+        owners, ids, x, y, cargo = self.owners[kept], self.ids[kept], x[kept], y[kept], cargo[kept]
+        inspired, mining = self.inspired[kept], mining[kept]
+
+        spawning = np.zeros(self.num_players, dtype=bool)
+        spawning[list(spawns)] = True
+        spawning &= self.player_halite >= game_constants.SHIP_COST
+        if spawning.any():
+            spawners = np.flatnonzero(spawning)
+            self.player_halite[spawners] -= game_constants.SHIP_COST
+            new_ids = np.arange(self.next_ship_id, self.next_ship_id + len(spawners))
+            self.next_ship_id += len(spawners)
+            new = np.zeros(len(spawners), dtype=np.int64)
+            owners = np.concatenate([owners, spawners])
+            ids = np.concatenate([ids, new_ids])
+            x = np.concatenate([x, self.shipyard_x[spawners]])
+            y = np.concatenate([y, self.shipyard_y[spawners]])
+            cargo = np.concatenate([cargo, new])
+            inspired = np.concatenate([inspired, new.astype(bool)])
+            mining = np.concatenate([mining, new.astype(bool)])
+
+        # Every ship on a shared cell sinks. Its cargo goes to the owner of a structure there, else into the sea
+        cells = y * width + x
+        crashed = np.bincount(cells, minlength=width * height)[cells] > 1
+        if crashed.any():
+            crash_cells = cells[crashed]
+            structure_owners = self.structure_owner.ravel()[crash_cells]
+            on_structure = structure_owners != NO_OWNER
+            np.add.at(self.player_halite, structure_owners[on_structure], cargo[crashed][on_structure])
+            np.add.at(self.halite.ravel(), crash_cells[~on_structure], cargo[crashed][~on_structure])
+            survived = ~crashed
+            owners, ids, x, y, cargo = owners[survived], ids[survived], x[survived], y[survived], cargo[survived]
+            inspired, mining = inspired[survived], mining[survived]
+
+        if mining.any():
+            miners = np.flatnonzero(mining)
+            mined_halite = self.halite[y[miners], x[miners]]
+            mined = np.where(inspired[miners], game_constants.inspired_mined[mined_halite],
+                             game_constants.mined[mined_halite])
+            mined = np.minimum(mined, game_constants.MAX_HALITE - cargo[miners])
+            bonus = (mined * game_constants.INSPIRED_BONUS_MULTIPLIER).astype(np.int64)
+            bonus = np.where(inspired[miners], bonus, 0)
+            self.halite[y[miners], x[miners]] = mined_halite - mined
+            cargo[miners] = np.minimum(cargo[miners] + mined + bonus, game_constants.MAX_HALITE)
+
+        home = self.structure_owner[y, x] == owners
+        if home.any():
+            np.add.at(self.player_halite, owners[home], cargo[home])
+            cargo[home] = 0
+
+        self.owners, self.ids, self.x, self.y, self.ship_halite = owners, ids, x, y, cargo
+        self.inspired = self._find_inspired()
+        self.turn_number += 1
+
+    def _construct(self, rows, moves, cell_halite):
+        """
+        Builds the dropoffs that can be built, in ship order, and turns the other
+        CONSTRUCT moves into STILL.
+        """
+        game_constants = self.constants
+        for row in rows.tolist():
+            owner, x, y = int(self.owners[row]), int(self.x[row]), int(self.y[row])
+            cost = game_constants.DROPOFF_COST - int(self.ship_halite[row]) - int(cell_halite[row])
+            if self.structure_owner[y, x] != NO_OWNER or cost > self.player_halite[owner]:
+                moves[row] = STILL
+                continue
+            self.player_halite[owner] -= cost
+            self.structure_owner[y, x] = owner
+            self.halite[y, x] = 0
+
+    def _find_inspired(self):
+        """
+        Counts, for every ship, the opponent ships within the inspiration radius. Only the
+        cells under ships are correlated, which is cheaper than correlating the whole map.
+        :return: A boolean array, one entry per ship
+        """
+        game_constants = self.constants
+        if not game_constants.INSPIRATION_ENABLED or not len(self.ids):
+            return np.zeros(len(self.ids), dtype=bool)
+        cells = self.y * self.width + self.x
+        map_size = self.width * self.height
+        total = np.bincount(cells, minlength=map_size).reshape(self.height, self.width)
+        own = np.bincount(self.owners * map_size + cells, minlength=self.num_players * map_size)
+        own = own.reshape(-1, self.height, self.width)
+        opponents = correlate_at(total - own, self._inspiration_kernel, self.x, self.y, self.owners)
+        return opponents >= game_constants.INSPIRATION_SHIP_COUNT
+
+
+def infer_commands(previous, game):
+    """
+    Works out, as far as frames allow, the commands that took a state to the game's current frame.
+
+    Ships still alive moved by their displacement, and ships gone from under a new dropoff
+    of their owner built it. Any other missing ship was destroyed: it is taken to have moved
+    onto a cell other missing ships could also reach, preferring the one whose halite grew
+    the most from sunk cargo, and a ship with no such partner onto a neighbouring shipyard
+    where a ship was spawned. New ships mean their owner spawned.
+    :param previous: The GameState of the frame before
+    :param game: The Game, updated to the frame after
+    :return: The move codes and spawning player ids, as taken by GameState.step
+    """
+    structure_owner = game.game_map.structure_owner
+    moves = np.full(len(previous.ids), STILL, dtype=np.intp)
+    spawns = set()
+    known_ids = set(previous.ids.tolist())
+    for player_id, player in game.players.items():
+        if any(ship_id not in known_ids for ship_id in player.fleet.ids.tolist()):
+            spawns.add(player_id)
+
+    missing = []
+    for row, (owner, ship_id, x, y) in enumerate(zip(previous.owners.tolist(), previous.ids.tolist(),
+                                                    previous.x.tolist(), previous.y.tolist())):
+        fleet = game.players[owner].fleet
+        if ship_id in fleet:
+            index = fleet.row(ship_id)
+            moves[row] = _destinations(previous, row).index((int(fleet.x[index]), int(fleet.y[index])))
+        elif previous.structure_owner[y, x] == NO_OWNER and structure_owner[y, x] == owner:
+            moves[row] = CONSTRUCT
+        else:
+            missing.append(row)
+
+    reachable = {}
+    for row in missing:
+        for cell in _destinations(previous, row):
+            reachable[cell] = reachable.get(cell, 0) + 1
+    dumped = game.game_map.halite - previous.halite
+    shipyards = {(int(x), int(y)): player_id
+                 for player_id, (x, y) in enumerate(zip(previous.shipyard_x, previous.shipyard_y))}
+    for row in missing:
+        # Staying still comes first, so it wins ties
+        cells = _destinations(previous, row)
+        codes = [STILL] + list(range(STILL))
+        code = max(codes, key=lambda candidate: (reachable[cells[candidate]] > 1,
+                                                 dumped[cells[candidate][::-1]], reachable[cells[candidate]]))
+        if reachable[cells[code]] == 1:
+            code = next((candidate for candidate in codes if cells[candidate] in shipyards), code)
+            if cells[code] in shipyards:
+                spawns.add(shipyards[cells[code]])
+        moves[row] = code
+    return moves, sorted(spawns)
+
+
+def _destinations(state, row):
+    """
+    :return: The cell each direction code would take a ship to, as x, y tuples
+    """
+    x, y = int(state.x[row]), int(state.y[row])
+    return [((x + dx) % state.width, (y + dy) % state.height) for dx, dy in _OFFSETS[:STILL + 1].tolist()]
+
+
+def check_conformance(previous, game, max_reports=10):
+    """
+    Replays the turn between a state and the game's current frame and lists where the
+    simulated result differs from what the engine sent. Calling this every turn of a
+    game, e.g. from a bot in a local match, checks the simulator against the real engine.
+
+    Spawned ships are matched by owner, position and cargo, as their ids may differ.
+    :param previous: The GameState of the frame before
+    :param game: The Game, updated to the frame after
+    :param max_reports: How many differing ships or cells to describe at most
+    :return: A list of messages, empty if the simulation matched
+    """
+    moves, spawns = infer_commands(previous, game)
+    simulated = previous.copy()
+    simulated.step(moves, spawns)
+    actual = GameState.from_game(game)
+
+    messages = []
+    if simulated.turn_number != actual.turn_number:
+        messages.append("Turn {} simulated as turn {}".format(actual.turn_number, simulated.turn_number))
+    for player_id in np.flatnonzero(simulated.player_halite != actual.player_halite).tolist():
+        messages.append("Player {} has {} halite, simulated {}".format(
+            player_id, actual.player_halite[player_id], simulated.player_halite[player_id]))
+
+    ys, xs = np.nonzero(simulated.halite != actual.halite)
+    for x, y in list(zip(xs.tolist(), ys.tolist()))[:max_reports]:
+        messages.append("Cell ({}, {}) has {} halite, simulated {}".format(
+            x, y, actual.halite[y, x], simulated.halite[y, x]))
+    ys, xs = np.nonzero(simulated.structure_owner != actual.structure_owner)
+    for x, y in list(zip(xs.tolist(), ys.tolist()))[:max_reports]:
+        messages.append("Cell ({}, {}) has a structure of {}, simulated {}".format(
+            x, y, actual.structure_owner[y, x], simulated.structure_owner[y, x]))
+
+    def ships(state):
+        spawned = ~np.isin(state.ids, previous.ids)
+        ids = np.where(spawned, -1, state.ids)
+        return collections.Counter(zip(state.owners.tolist(), ids.tolist(), state.x.tolist(),
+                                       state.y.tolist(), state.ship_halite.tolist()))
+
+    expected, found = ships(simulated), ships(actual)
+    differing = [("Missing", ship) for ship in (expected - found).elements()]
+    differing += [("Unexpected", ship) for ship in (found - expected).elements()]
+    for kind, (owner, ship_id, x, y, cargo) in sorted(differing, key=lambda item: item[1])[:max_reports]:
+        messages.append("{} ship {} of player {} at ({}, {}) with {} halite".format(
+            kind, "(spawned)" if ship_id < 0 else ship_id, owner, x, y, cargo))
+    return messages
@@ -0,0 +1,112 @@
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    Ships bucketed into a uniform grid of square cells over the toroidal map, for
+    proximity queries that only look at nearby ships.
+
+    ids, owners, x and y are parallel arrays with one row per indexed ship. Queries
+    return rows into them along with each ship's wrap-aware Manhattan distance.
+    """
+
+    """The side of a bucket, in map cells."""
+    bucket_size = 8
+
+    def __init__(self, width, height, ids, owners, x, y):
+        """
+        :param width: The map width
+        :param height: The map height
+        :param ids: The ships' ids
+        :param owners: The ships' owners
+        :param x: The ships' x coordinates, normalized
+        :param y: The ships' y coordinates, normalized
+        """
+        self.width = width
+        self.height = height
+        self.ids = ids
+        self.owners = owners
+        self.x = x
+        self.y = y
+
+        self._columns = -(-width // self.bucket_size)
+        self._rows = -(-height // self.bucket_size)
+        buckets = (y // self.bucket_size) * self._columns + x // self.bucket_size
+        self._order = np.argsort(buckets, kind='stable')
+        self._starts = np.searchsorted(buckets[self._order], np.arange(self._columns * self._rows + 1))
+
+    @staticmethod
+    def from_players(game_map, players):
+        """
+        Indexes the current ships of some players.
+        :param game_map: The GameMap the ships are on
+        :param players: The Players whose ships to index
+        :return: A SpatialIndex
+        """
+        fleets = [player.fleet for player in players]
+        owners = [np.full(len(fleet), player.id, dtype=np.int64) for player, fleet in zip(players, fleets)]
+        return SpatialIndex(game_map.width, game_map.height,
+                            np.concatenate([fleet.ids for fleet in fleets] + [np.zeros(0, dtype=np.int64)]),
+                            np.concatenate(owners + [np.zeros(0, dtype=np.int64)]),
+                            np.concatenate([fleet.x for fleet in fleets] + [np.zeros(0, dtype=np.int64)]),
+                            np.concatenate([fleet.y for fleet in fleets] + [np.zeros(0, dtype=np.int64)]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _bucket_span(self, centre, radius, size, count):
+        """
+        :return: The bucket rows or columns covering the wrapped cell range centre +/- radius
+        """
+        if 2 * radius + 1 >= size:
+            return range(count)
+        start = (centre - radius) % size
+        end = start + 2 * radius
+        if end < size:
+            return range(start // self.bucket_size, end // self.bucket_size + 1)
+        tail = range(start // self.bucket_size, count)
+        head = range(0, min((end - size) // self.bucket_size + 1, tail.start))
+        return list(head) + list(tail)
+
+    def _candidates(self, position, radius):
+        rows = []
+        for bucket_row in self._bucket_span(position.y, radius, self.height, self._rows):
+            for bucket_column in self._bucket_span(position.x, radius, self.width, self._columns):
+                bucket = bucket_row * self._columns + bucket_column
+                rows.append(self._order[self._starts[bucket]:self._starts[bucket + 1]])
+        return np.concatenate(rows) if rows else self._order[:0]
+
+    def _distances(self, position, rows):
+        dx = np.abs(self.x[rows] - position.x)
+        dy = np.abs(self.y[rows] - position.y)
+        return np.minimum(dx, self.width - dx) + np.minimum(dy, self.height - dy)
+
+    def within_radius(self, position, radius):
+        """
+        Finds the ships within a distance of a position.
+        :param position: A normalized position
+        :param radius: The largest distance to include
+        :return: rows, distances as arrays, in no particular order
+        """
+        rows = self._candidates(position, radius)
+        distances = self._distances(position, rows)
+        close = distances <= radius
+        return rows[close], distances[close]
+
+    def nearest(self, position, k):
+        """
+        Finds the closest ships to a position. Ties are broken by row.
+        :param position: A normalized position
+        :param k: How many ships to return at most
+        :return: rows, distances as arrays, nearest first
+        """
+        k = min(k, len(self))
+        furthest = self.width // 2 + self.height // 2
+        radius = self.bucket_size
+        while True:
+            rows, distances = self.within_radius(position, min(radius, furthest))
+            if len(rows) >= k or radius >= furthest:
+                break
+            radius *= 2
+        order = np.lexsort((rows, distances))[:k]
+        return rows[order], distances[order]
@@ -12,6 +12,7 @@ import numpy as np
 from collections import defaultdict
 
 np.set_printoptions(precision=1)
+NEIGHBOR_RADIUS = 8
 
 game = hlt.Game()
 game.ready("funkster")
@@ -76,11 +77,10 @@ def calculate_longterm_halite(ship, dir):
 def calculate_neighbor_penalty(ship, pos):
     if len(me.get_ships()) == 1:
         return 0
-    penalty = 0
-    for other in me.get_ships():
-        if other.id != ship.id:
-            dis = game_map.calculate_distance(other.position, pos)
-            penalty += 100 / (dis + 1)
+    # Ships further away than this add little, and are left out so the cost follows local density
+    rows, dis = friendly_ships.within_radius(pos, NEIGHBOR_RADIUS)
+    dis = dis[friendly_ships.ids[rows] != ship.id]
+    penalty = np.sum(100 / (dis + 1))
     penalty /= len(me.get_ships()) - 1
     return penalty
 
@@ -119,10 +119,8 @@ while True:
     game.update_frame()
     me = game.me
     game_map = game.game_map
-    halite_nparray = np.zeros((game_map.width, game_map.height))
-    for x in range(game_map.width):
-        for y in range(game_map.height):
-            halite_nparray[x, y] = game_map[Position(x, y)].halite_amount
+    halite_nparray = game_map.halite.T.astype(np.float64)
+    friendly_ships = game_map.friendly_index(me.id)
 
     planned_moves = {}
 
@@ -2,6 +2,9 @@ import numpy as np
 from time import process_time
 import random
 
+from hlt.padded_grid import PaddedGrid
+from hlt.positionals import Position
+
 np.set_printoptions(precision=1, suppress=True)
 
 a = np.zeros((10, 10))
@@ -10,8 +13,12 @@ for i in range(10):
         a[i, j] = i*10 + j
 
 
+padded = PaddedGrid(10, 10, 15)
+padded.refresh(a)
+
+
 def ship_surroundings(x, y, radius=15):
-    return a.take(range(y - radius, y + radius + 1), axis=0, mode='wrap').take(range(x - radius, x + radius + 1), axis=1, mode='wrap')
+    return padded.window(Position(x % 10, y % 10, False), radius)
 
 def build_weight_matrix(radius=15):
     mat = np.zeros((2*radius + 1, 2*radius + 1))
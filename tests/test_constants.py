@@ -0,0 +1,28 @@
+import numpy as np
+
+from hlt.constants import GameConstants
+
+CONSTANTS = GameConstants({
+    'NEW_ENTITY_ENERGY_COST': 1000, 'DROPOFF_COST': 4000, 'MAX_ENERGY': 1000, 'MAX_TURNS': 400,
+    'EXTRACT_RATIO': 4, 'MOVE_COST_RATIO': 10, 'INSPIRATION_ENABLED': True, 'INSPIRATION_RADIUS': 4,
+    'INSPIRATION_SHIP_COUNT': 2, 'INSPIRED_EXTRACT_RATIO': 4, 'INSPIRED_BONUS_MULTIPLIER': 2.0,
+    'INSPIRED_MOVE_COST_RATIO': 10, 'MAX_CELL_PRODUCTION': 1000,
+})
+
+
+def test_tables_follow_the_engine_rounding():
+    assert CONSTANTS.mined[101] == 26
+    assert CONSTANTS.move_cost[99] == 9
+    assert CONSTANTS.inspiration_bonus[101] == 52
+    np.testing.assert_array_equal(CONSTANTS.mined[np.array([[0, 1], [4, 5]])], [[0, 1], [1, 2]])
+
+
+def test_lookups_beyond_the_halite_limit_are_computed():
+    beyond = CONSTANTS.halite_limit + np.array([0, 1, 200, 10000])
+    np.testing.assert_array_equal(CONSTANTS.mined[beyond], -(-beyond // 4))
+    np.testing.assert_array_equal(CONSTANTS.move_cost[beyond], beyond // 10)
+    np.testing.assert_array_equal(CONSTANTS.inspiration_bonus[beyond], -(-beyond // 4) * 2)
+    assert CONSTANTS.mined[CONSTANTS.halite_limit + 201] == -(-(CONSTANTS.halite_limit + 201) // 4)
+    mixed = np.array([3, CONSTANTS.halite_limit + 7])
+    np.testing.assert_array_equal(CONSTANTS.move_cost[mixed], mixed // 10)
+    np.testing.assert_array_equal(CONSTANTS.gained(mixed, np.array([0, 0])), [1, 1000])
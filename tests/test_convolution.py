@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from hlt.convolution import Kernel, MaintainedField, correlate, correlate_at
+
+SHAPE = (32, 40)
+
+
+def shift_kernel():
+    """A small integer kernel, applied by shifting."""
+    return Kernel(np.random.RandomState(1).randint(-3, 4, (5, 5)))
+
+
+def fft_kernel():
+    """A kernel just large enough to be applied through an FFT."""
+    offsets = np.abs(np.arange(-6, 7))
+    return Kernel(.9 ** (offsets[:, None] + offsets[None, :]))
+
+
+def random_updates(rng, field, num_changes):
+    ys, xs = np.divmod(rng.choice(SHAPE[0] * SHAPE[1], num_changes, replace=False), SHAPE[1])
+    values = field.values[ys, xs] + rng.randint(1, 1000, num_changes)
+    field.update(xs, ys, values)
+
+
+@pytest.mark.parametrize('make_kernel, uses_fft', [(shift_kernel, False), (fft_kernel, True)])
+def test_scattered_updates_track_a_fresh_correlation(make_kernel, uses_fft):
+    rng = np.random.RandomState(0)
+    kernel = make_kernel()
+    assert kernel.uses_fft == uses_fft
+    field = MaintainedField(kernel, rng.randint(0, 1000, SHAPE))
+    for _ in range(200):
+        random_updates(rng, field, rng.randint(1, 4))
+        expected = correlate(field.values, kernel)
+        np.testing.assert_allclose(field.field, expected, rtol=1e-9, atol=1e-6 * np.abs(expected).max())
+    # Only the periodic resync recomputed the field
+    assert field.recomputes == 200 // (MaintainedField.resync_interval + 1)
+
+
+@pytest.mark.parametrize('make_kernel', [shift_kernel, fft_kernel])
+def test_large_updates_fall_back_to_a_full_recompute(make_kernel):
+    rng = np.random.RandomState(2)
+    kernel = make_kernel()
+    field = MaintainedField(kernel, rng.randint(0, 1000, SHAPE))
+    too_many = int(MaintainedField.scatter_limit * SHAPE[0] * SHAPE[1] // len(kernel._values)) + 1
+    for turn in range(1, 6):
+        random_updates(rng, field, min(too_many, SHAPE[0] * SHAPE[1]))
+        assert field.recomputes == turn
+        np.testing.assert_allclose(field.field, correlate(field.values, kernel))
+
+
+def test_unchanged_cells_leave_the_field_alone():
+    rng = np.random.RandomState(3)
+    field = MaintainedField(shift_kernel(), rng.randint(0, 1000, SHAPE))
+    before = field.field.copy()
+    ys, xs = np.nonzero(np.ones(SHAPE, dtype=bool))
+    field.update(xs, ys, field.values[ys, xs].copy())
+    assert field.recomputes == 0
+    np.testing.assert_array_equal(field.field, before)
+
+
+@pytest.mark.parametrize('make_kernel', [shift_kernel, fft_kernel, lambda: Kernel.diamond(4)])
+def test_correlate_at_matches_correlate_at_the_chosen_cells(make_kernel):
+    rng = np.random.RandomState(4)
+    kernel = make_kernel()
+    maps = rng.rand(3, *SHAPE)
+    ys, xs = np.divmod(rng.choice(SHAPE[0] * SHAPE[1], 50, replace=False), SHAPE[1])
+    layers = rng.randint(0, len(maps), len(xs))
+    np.testing.assert_allclose(correlate_at(maps[0], kernel, xs, ys), correlate(maps[0], kernel)[ys, xs])
+    expected = np.stack([correlate(matrix, kernel) for matrix in maps])[layers, ys, xs]
+    np.testing.assert_allclose(correlate_at(maps, kernel, xs, ys, layers), expected)
@@ -0,0 +1,120 @@
+import heapq
+
+import numpy as np
+import pytest
+
+from hlt import constants
+from hlt.game_map import GameMap
+from hlt.navigation import cost_to_go
+from hlt.positionals import Direction, Position
+from hlt.precompute import Tables
+
+STILL = Direction.to_code(Direction.Still)
+
+
+def dijkstra(step_cost, targets):
+    """
+    Cheapest (cost, turns) from every cell to the nearest target, one cell at a time.
+    :param targets: Flat indices of the target cells
+    """
+    height, width = step_cost.shape
+    best = {target: (0, 0) for target in targets}
+    queue = [(0, 0, target) for target in targets]
+    heapq.heapify(queue)
+    while queue:
+        cost, turns, cell = heapq.heappop(queue)
+        if best[cell] < (cost, turns):
+            continue
+        y, x = divmod(cell, width)
+        for dx, dy in ((0, -1), (0, 1), (1, 0), (-1, 0)):
+            neighbour = ((y + dy) % height) * width + (x + dx) % width
+            candidate = (cost + int(step_cost.flat[neighbour]), turns + 1)
+            if candidate < best.get(neighbour, (np.inf, np.inf)):
+                best[neighbour] = candidate
+                heapq.heappush(queue, candidate + (neighbour,))
+    cost = np.array([best[cell][0] for cell in range(step_cost.size)]).reshape(step_cost.shape)
+    turns = np.array([best[cell][1] for cell in range(step_cost.size)]).reshape(step_cost.shape)
+    return cost, turns
+
+
+def solve(step_cost, targets):
+    height, width = step_cost.shape
+    Position._allocate_table(width, height)
+    return cost_to_go(Tables(width, height).neighbors, step_cost, np.array(targets))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_cost_and_turns_match_dijkstra(seed):
+    rng = np.random.RandomState(seed)
+    height, width = rng.randint(4, 20, 2)
+    # Few distinct costs, so that many routes tie on cost and must be told apart by turns
+    step_cost = rng.randint(0, 4, (height, width)) * rng.randint(1, 100)
+    targets = rng.choice(height * width, rng.randint(1, 4), replace=False).tolist()
+    field = solve(step_cost, targets)
+    cost, turns = dijkstra(step_cost, targets)
+    np.testing.assert_array_equal(field.cost, cost)
+    np.testing.assert_array_equal(field.turns, turns)
+
+
+def test_equal_costs_are_broken_by_turns():
+    # Every route from (2, 0) to (0, 0) burns the 5 on its start cell only, the direct
+    # one is two moves west, and everything else is free
+    step_cost = np.zeros((5, 8), dtype=np.int64)
+    step_cost[0, 2] = 5
+    field = solve(step_cost, [0])
+    assert field.cost[0, 2] == 5
+    assert field.turns[0, 2] == 2
+    assert field.next_step(Position(2, 0)) == Direction.West
+    # Free cells take the fewest moves, wrapping around the map
+    assert field.turns[0, 7] == 1
+    assert field.turns[3, 0] == 2
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_next_step_leads_to_a_neighbour_on_the_cheapest_route(seed):
+    rng = np.random.RandomState(seed)
+    height, width = 12, 16
+    step_cost = rng.randint(0, 100, (height, width))
+    targets = rng.choice(height * width, 3, replace=False).tolist()
+    field = solve(step_cost, targets)
+    for y in range(height):
+        for x in range(width):
+            if y * width + x in targets:
+                continue
+            dx, dy = Direction.from_code(int(field.next_move[y, x]))
+            assert (dx, dy) != Direction.Still
+            ny, nx = (y + dy) % height, (x + dx) % width
+            assert field.cost[ny, nx] + step_cost[y, x] == field.cost[y, x]
+            assert field.turns[ny, nx] + 1 == field.turns[y, x]
+
+
+def test_targets_stay_still():
+    rng = np.random.RandomState(0)
+    step_cost = rng.randint(0, 100, (6, 6))
+    field = solve(step_cost, [0, 14, 35])
+    for target in (0, 14, 35):
+        y, x = divmod(target, 6)
+        assert field.next_move[y, x] == STILL
+        assert field.next_step(Position(x, y)) == Direction.Still
+        assert field.cost[y, x] == 0 and field.turns[y, x] == 0
+
+
+def test_game_map_caches_fields_until_the_next_update(monkeypatch):
+    monkeypatch.setattr(constants, 'MOVE_COST_RATIO', 10, raising=False)
+    rng = np.random.RandomState(1)
+    game_map = GameMap(rng.randint(0, 1000, (8, 8)), 8, 8)
+    targets = [Position(1, 1), Position(5, 6)]
+
+    field = game_map.cost_to_go(targets)
+    assert game_map.cost_to_go(list(reversed(targets))) is field
+    cost, turns = dijkstra(game_map.halite // 10, [1 * 8 + 1, 6 * 8 + 5])
+    np.testing.assert_array_equal(field.cost, cost)
+
+    # A given step cost is solved afresh rather than served from the cache
+    assert game_map.cost_to_go(targets, step_cost=np.zeros((8, 8), dtype=np.int64)) is not field
+
+    game_map._update(np.array([[3, 3, 999]]))
+    updated = game_map.cost_to_go(targets)
+    assert updated is not field
+    cost, turns = dijkstra(game_map.halite // 10, [1 * 8 + 1, 6 * 8 + 5])
+    np.testing.assert_array_equal(updated.cost, cost)
@@ -0,0 +1,326 @@
+import math
+import types
+
+import numpy as np
+import pytest
+
+from hlt.constants import GameConstants
+from hlt.fleet import Fleet
+from hlt.game_map import NO_OWNER
+from hlt.positionals import Direction
+from hlt.simulator import CONSTRUCT, STILL, GameState, check_conformance
+
+ENGINE_CONSTANTS = {
+    'NEW_ENTITY_ENERGY_COST': 1000,
+    'DROPOFF_COST': 4000,
+    'MAX_ENERGY': 1000,
+    'MAX_TURNS': 400,
+    'EXTRACT_RATIO': 4,
+    'MOVE_COST_RATIO': 10,
+    'INSPIRATION_ENABLED': True,
+    'INSPIRATION_RADIUS': 4,
+    'INSPIRATION_SHIP_COUNT': 2,
+    'INSPIRED_EXTRACT_RATIO': 4,
+    'INSPIRED_BONUS_MULTIPLIER': 2.0,
+    'INSPIRED_MOVE_COST_RATIO': 10,
+    'MAX_CELL_PRODUCTION': 1000,
+}
+CONSTANTS = GameConstants(ENGINE_CONSTANTS)
+
+NORTH, SOUTH, EAST, WEST = (Direction.to_code(direction) for direction in
+                            (Direction.North, Direction.South, Direction.East, Direction.West))
+
+
+def make_state(ships, halite=0, player_halite=5000, shipyards=((2, 2), (13, 13)), size=16,
+               game_constants=CONSTANTS):
+    """
+    :param ships: owner, id, x, y, cargo rows
+    :param halite: The halite of every cell, or a size x size array
+    """
+    halite = np.array(np.broadcast_to(halite, (size, size)), dtype=np.int64)
+    structure_owner = np.full((size, size), NO_OWNER, dtype=np.int32)
+    for player_id, (x, y) in enumerate(shipyards):
+        structure_owner[y, x] = player_id
+    columns = np.array(ships, dtype=np.int64).reshape(-1, 5).T
+    return GameState(game_constants, 1, halite, structure_owner,
+                     np.full(len(shipyards), player_halite, dtype=np.int64),
+                     np.array([x for x, y in shipyards]), np.array([y for x, y in shipyards]), *columns)
+
+
+def ship_rows(state):
+    return sorted(zip(state.owners.tolist(), state.ids.tolist(), state.x.tolist(), state.y.tolist(),
+                      state.ship_halite.tolist()))
+
+
+def test_mining_rounds_up():
+    state = make_state([(0, 1, 5, 5, 0)], halite=101)
+    state.step([STILL])
+    assert ship_rows(state) == [(0, 1, 5, 5, 26)]
+    assert state.halite[5, 5] == 75
+
+
+def test_mining_stops_at_capacity():
+    state = make_state([(0, 1, 5, 5, 990)], halite=800)
+    state.step([STILL])
+    assert ship_rows(state) == [(0, 1, 5, 5, 1000)]
+    assert state.halite[5, 5] == 790
+
+
+def test_inspired_ship_gains_the_truncated_bonus():
+    game_constants = GameConstants(dict(ENGINE_CONSTANTS, INSPIRED_BONUS_MULTIPLIER=1.5))
+    # Two opponent ships within four cells inspire the miner
+    state = make_state([(0, 1, 5, 5, 0), (1, 2, 7, 7, 0), (1, 3, 5, 9, 0)], halite=105,
+                       game_constants=game_constants)
+    assert state.inspired.tolist() == [True, False, False]
+    state.step([STILL, STILL, STILL])
+    assert ship_rows(state)[0] == (0, 1, 5, 5, 27 + 40)
+    assert state.halite[5, 5] == 105 - 27
+
+
+def test_inspiration_counts_opponents_only_and_wraps():
+    # Across the edges, ship 1 is within four cells of ships 3 and 4, ship 2 only of ship 3,
+    # and ship 3 of ships 1 and 2. Ships of the same player never count
+    state = make_state([(0, 1, 0, 0, 0), (0, 2, 1, 0, 0), (1, 3, 15, 15, 0), (1, 4, 0, 12, 0),
+                        (1, 5, 5, 5, 0)])
+    assert state.inspired.tolist() == [True, False, True, False, False]
+
+
+def test_moving_pays_the_truncated_move_cost():
+    state = make_state([(0, 1, 5, 5, 20)], halite=99)
+    state.step([EAST])
+    assert ship_rows(state) == [(0, 1, 6, 5, 11)]
+    assert state.halite[5, 5] == 99
+
+
+def test_ship_without_halite_to_move_stays_and_mines():
+    state = make_state([(0, 1, 5, 5, 8)], halite=99)
+    state.step([NORTH])
+    assert ship_rows(state) == [(0, 1, 5, 5, 8 + 25)]
+    assert state.halite[5, 5] == 74
+
+
+def test_moves_wrap_around_the_map():
+    state = make_state([(0, 1, 0, 0, 0), (1, 2, 3, 15, 0)])
+    state.step([WEST, SOUTH])
+    assert ship_rows(state) == [(0, 1, 15, 0, 0), (1, 2, 3, 0, 0)]
+
+
+def test_collision_sinks_cargo_into_the_sea():
+    state = make_state([(0, 1, 5, 5, 300), (1, 2, 7, 5, 200)], halite=10)
+    state.step([EAST, WEST])
+    assert ship_rows(state) == []
+    assert state.halite[5, 6] == 10 + 299 + 199
+    assert state.player_halite.tolist() == [5000, 5000]
+
+
+def test_collision_on_a_structure_goes_to_its_owner():
+    state = make_state([(0, 1, 12, 13, 300), (1, 2, 14, 13, 200)])
+    state.step([EAST, WEST])
+    assert ship_rows(state) == []
+    assert state.player_halite.tolist() == [5000, 5000 + 500]
+    assert state.halite[13, 13] == 0
+
+
+def test_ship_deposits_on_its_own_structure_only():
+    state = make_state([(0, 1, 1, 2, 300), (0, 2, 12, 13, 400)])
+    state.step([EAST, EAST])
+    assert ship_rows(state) == [(0, 1, 2, 2, 0), (0, 2, 13, 13, 400)]
+    assert state.player_halite.tolist() == [5300, 5000]
+
+
+def test_dropoff_is_credited_with_cargo_and_cell_halite():
+    state = make_state([(0, 1, 8, 8, 300)], halite=500)
+    state.step([CONSTRUCT])
+    assert ship_rows(state) == []
+    assert state.structure_owner[8, 8] == 0
+    assert state.halite[8, 8] == 0
+    assert state.player_halite[0] == 5000 - (4000 - 300 - 500)
+
+
+def test_unaffordable_dropoff_is_not_built():
+    state = make_state([(0, 1, 8, 8, 0)], halite=100, player_halite=1000)
+    state.step([CONSTRUCT])
+    assert ship_rows(state) == [(0, 1, 8, 8, 25)]
+    assert state.structure_owner[8, 8] == NO_OWNER
+    assert state.player_halite[0] == 1000
+
+
+def test_spawn_appears_on_the_shipyard():
+    state = make_state([])
+    state.step([], spawns=[1])
+    assert ship_rows(state) == [(1, 0, 13, 13, 0)]
+    assert state.player_halite.tolist() == [5000, 4000]
+
+
+def test_spawn_collides_with_a_ship_on_the_shipyard():
+    state = make_state([(0, 1, 2, 2, 0), (1, 2, 2, 3, 700)])
+    state.step([STILL, NORTH], spawns=[0])
+    assert ship_rows(state) == []
+    # The enemy's cargo, less its move cost, goes to the shipyard's owner
+    assert state.player_halite.tolist() == [5000 - 1000 + 700, 5000]
+
+
+def test_game_ends_after_the_last_turn():
+    state = make_state([(0, 1, 2, 3, 100)])
+    state.turn_number = CONSTANTS.MAX_TURNS
+    assert not state.is_over()
+    state.step([NORTH])
+    assert state.is_over()
+    assert state.scores().tolist() == [5100, 5000]
+
+
+def reference_step(state, moves, spawns):
+    """
+    The rules applied ship by ship, to check the vectorized step against.
+    :return: halite, structure_owner, player_halite and sorted ship rows after the turn
+    """
+    game_constants = state.constants
+    halite, structure_owner = state.halite.copy(), state.structure_owner.copy()
+    player_halite = state.player_halite.copy()
+    ships = [dict(owner=owner, id=ship_id, x=x, y=y, cargo=cargo, inspired=inspired, move=move, mines=False)
+             for owner, ship_id, x, y, cargo, inspired, move in zip(
+                 state.owners.tolist(), state.ids.tolist(), state.x.tolist(), state.y.tolist(),
+                 state.ship_halite.tolist(), state.inspired.tolist(), list(moves))]
+
+    built = []
+    for ship in ships:
+        if ship['move'] == CONSTRUCT:
+            cost = game_constants.DROPOFF_COST - ship['cargo'] - halite[ship['y'], ship['x']]
+            if structure_owner[ship['y'], ship['x']] == NO_OWNER and cost <= player_halite[ship['owner']]:
+                player_halite[ship['owner']] -= cost
+                structure_owner[ship['y'], ship['x']] = ship['owner']
+                halite[ship['y'], ship['x']] = 0
+                built.append(ship)
+            else:
+                ship['move'] = STILL
+    ships = [ship for ship in ships if ship not in built]
+
+    for ship in ships:
+        ratio = game_constants.INSPIRED_MOVE_COST_RATIO if ship['inspired'] else game_constants.MOVE_COST_RATIO
+        cost = halite[ship['y'], ship['x']] // ratio
+        if ship['move'] != STILL and cost <= ship['cargo']:
+            dx, dy = Direction.from_code(ship['move'])
+            ship['cargo'] -= cost
+            ship['x'] = (ship['x'] + dx) % state.width
+            ship['y'] = (ship['y'] + dy) % state.height
+        else:
+            ship['mines'] = True
+
+    next_ship_id = state.next_ship_id
+    for player_id in sorted(set(spawns)):
+        if player_halite[player_id] >= game_constants.SHIP_COST:
+            player_halite[player_id] -= game_constants.SHIP_COST
+            ships.append(dict(owner=player_id, id=next_ship_id, x=int(state.shipyard_x[player_id]),
+                              y=int(state.shipyard_y[player_id]), cargo=0, inspired=False, mines=False))
+            next_ship_id += 1
+
+    occupants = {}
+    for ship in ships:
+        occupants.setdefault((ship['x'], ship['y']), []).append(ship)
+    survivors = []
+    for (x, y), occupying in occupants.items():
+        if len(occupying) == 1:
+            survivors.extend(occupying)
+            continue
+        for ship in occupying:
+            if structure_owner[y, x] != NO_OWNER:
+                player_halite[structure_owner[y, x]] += ship['cargo']
+            else:
+                halite[y, x] += ship['cargo']
+
+    for ship in survivors:
+        if ship['mines']:
+            ratio = game_constants.INSPIRED_EXTRACT_RATIO if ship['inspired'] else game_constants.EXTRACT_RATIO
+            mined = min(math.ceil(halite[ship['y'], ship['x']] / ratio), game_constants.MAX_HALITE - ship['cargo'])
+            halite[ship['y'], ship['x']] -= mined
+            ship['cargo'] += mined
+            if ship['inspired']:
+                bonus = int(mined * game_constants.INSPIRED_BONUS_MULTIPLIER)
+                ship['cargo'] += min(bonus, game_constants.MAX_HALITE - ship['cargo'])
+        if structure_owner[ship['y'], ship['x']] == ship['owner']:
+            player_halite[ship['owner']] += ship['cargo']
+            ship['cargo'] = 0
+
+    rows = sorted((ship['owner'], ship['id'], ship['x'], ship['y'], ship['cargo']) for ship in survivors)
+    return halite, structure_owner, player_halite, rows
+
+
+def random_state(rng, num_ships, size=32, num_players=4):
+    halite = rng.randint(0, 1000, (size, size))
+    shipyards = list(zip(*np.divmod(rng.choice(size * size, num_players, replace=False), size)))
+    cells = rng.choice(size * size, num_ships, replace=False)
+    ships = np.stack([rng.randint(0, num_players, num_ships), np.arange(num_ships) * 2, cells % size,
+                      cells // size, rng.randint(0, 1001, num_ships)], axis=1)
+    state = make_state(ships, halite=halite, shipyards=shipyards, size=size)
+    state.player_halite = rng.randint(0, 6000, num_players).astype(np.int64)
+    return state
+
+
+def inspired_by_pairs(state):
+    dx = np.abs(state.x[:, None] - state.x[None, :])
+    dy = np.abs(state.y[:, None] - state.y[None, :])
+    distances = np.minimum(dx, state.width - dx) + np.minimum(dy, state.height - dy)
+    opponents = (distances <= state.constants.INSPIRATION_RADIUS) & (state.owners[:, None] != state.owners[None, :])
+    return opponents.sum(axis=1) >= state.constants.INSPIRATION_SHIP_COUNT
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_step_matches_the_reference_rules(seed):
+    rng = np.random.RandomState(seed)
+    state = random_state(rng, num_ships=120)
+    for _ in range(5):
+        moves = rng.randint(0, STILL + 1, len(state.ids))
+        moves[rng.rand(len(state.ids)) < .03] = CONSTRUCT
+        spawns = np.flatnonzero(rng.rand(state.num_players) < .5).tolist()
+        halite, structure_owner, player_halite, rows = reference_step(state, moves, spawns)
+        state.step(moves, spawns)
+        np.testing.assert_array_equal(state.halite, halite)
+        np.testing.assert_array_equal(state.structure_owner, structure_owner)
+        np.testing.assert_array_equal(state.player_halite, player_halite)
+        assert ship_rows(state) == rows
+        np.testing.assert_array_equal(state.inspired, inspired_by_pairs(state))
+
+
+def test_copy_is_independent():
+    state = make_state([(0, 1, 5, 5, 0)], halite=100)
+    copy = state.copy()
+    copy.step([STILL], spawns=[0])
+    assert ship_rows(state) == [(0, 1, 5, 5, 0)]
+    assert state.halite[5, 5] == 100
+    assert state.player_halite.tolist() == [5000, 5000]
+
+
+def as_game(state):
+    """Wraps a state in the parts of a Game that GameState.from_game reads."""
+    players = {}
+    for player_id in range(state.num_players):
+        rows = state.owners == player_id
+        fleet = Fleet(np.stack([state.ids[rows], state.x[rows], state.y[rows], state.ship_halite[rows]], axis=1))
+        shipyard = types.SimpleNamespace(position=types.SimpleNamespace(
+            x=int(state.shipyard_x[player_id]), y=int(state.shipyard_y[player_id])))
+        players[player_id] = types.SimpleNamespace(id=player_id, fleet=fleet, shipyard=shipyard,
+                                                   halite_amount=int(state.player_halite[player_id]))
+    game_map = types.SimpleNamespace(halite=state.halite, structure_owner=state.structure_owner)
+    return types.SimpleNamespace(constants=state.constants, turn_number=state.turn_number,
+                                 players=players, game_map=game_map)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_conformance_check_accepts_a_turn_played_by_the_rules(seed):
+    rng = np.random.RandomState(seed)
+    previous = random_state(rng, num_ships=25)
+    moves = rng.randint(0, STILL + 1, len(previous.ids))
+    moves[rng.rand(len(previous.ids)) < .05] = CONSTRUCT
+    following = previous.copy()
+    following.step(moves, spawns=[0, 2])
+    assert check_conformance(previous, as_game(following)) == []
+
+
+def test_conformance_check_reports_differences():
+    previous = make_state([(0, 1, 5, 5, 0)], halite=100)
+    following = previous.copy()
+    following.step([STILL])
+    following.halite[5, 5] += 1
+    following.player_halite[1] -= 1
+    messages = check_conformance(previous, as_game(following))
+    assert messages == ["Player 1 has 4999 halite, simulated 5000", "Cell (5, 5) has 76 halite, simulated 75"]
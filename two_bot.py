@@ -6,6 +6,7 @@ from enum import Enum
 from hlt import constants
 from hlt.positionals import Direction
 from hlt.positionals import Position
+from hlt.collisions import resolve_conflicts
 import logging
 import numpy as np
 from collections import defaultdict
@@ -20,18 +21,13 @@ logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
 
 def find_new_target(game, ship_targets, ship):
     game_map = game.game_map
-    cell_values = np.zeros((game_map.width, game_map.height))
     spos = game.me.shipyard.position
 
-    for i in range(game_map.width):
-        for j in range(game_map.height):
-            pos = Position(i, j)
-            dis = game_map.calculate_distance(ship.position, pos)
-            sdis = game_map.calculate_distance(spos, pos)
-            raw_value = game_map[pos].halite_amount / (dis + 1 + sdis)
-            if i == ship.position.x and j == ship.position.y:
-                raw_value += game_map[ship.position].halite_amount * .25
-            cell_values[i, j] = min(raw_value, constants.MAX_HALITE - ship.halite_amount)
+    dis = game_map.distance_field(ship.position)
+    sdis = game_map.distance_field(spos)
+    raw_values = game_map.halite / (dis + 1 + sdis)
+    raw_values[ship.position.y, ship.position.x] += game.constants.mined[game_map[ship.position].halite_amount]
+    cell_values = np.ascontiguousarray(np.minimum(raw_values, constants.MAX_HALITE - ship.halite_amount).T)
 
     dis = game_map.calculate_distance(ship.position, spos)
     cell_values[spos.x, spos.y] += ship.halite_amount / (dis + 1)
@@ -43,7 +39,7 @@ def find_new_target(game, ship_targets, ship):
     #         newpos = game_map.normalize(target.directional_offset(d))
     #         cell_values[newpos.x, newpos.y] -= 100
 
-    if ship.halite_amount < game_map[ship.position].halite_amount * .1:
+    if ship.halite_amount < game.constants.move_cost[game_map[ship.position].halite_amount]:
         cell_values[ship.position.x, ship.position.y] = 9999
     best_pos = np.unravel_index(cell_values.argmax(), cell_values.shape)
     logging.info("Ship {}'s best value is {}".format(ship.id, cell_values[best_pos[0], best_pos[1]]))
@@ -63,37 +59,20 @@ def planned_pos(game_map, planned_moves, ship):
     return ship.position
 
 def resolve_collisions(me, game_map, planned_moves):
-    has_collisions = True
-    while has_collisions:
-        active_positions = defaultdict(set)
-
-        for ship in me.get_ships():
-            ppos = planned_pos(game_map, planned_moves, ship)
-            active_positions[ppos].add(ship)
-
-        has_collisions = False
-        for pos, ships in active_positions.items():
-            if len(ships) > 1:
-                has_collisions = True
-                logging.info('{} ships at {}:'.format(len(ships), pos))
-                ship_to_move = None
-                least_halite_amt = 9999
-                for ship in ships:
-                    if planned_moves[ship.id] == ship.stay_still():
-                        logging.info('A ship wants to stay still!')
-                        # if one wants to stay still, everyone should stay still
-                        ship_to_move = None
-                        break
-
-                    # move ship sitting on least halite
-                    amt = game_map[ship.position].halite_amount
-                    if amt < least_halite_amt:
-                        ship_to_move = ship
-                        least_halite_amt = amt
-
-                for ship in ships:
-                    if ship is not ship_to_move:
-                        planned_moves[ship.id] = ship.stay_still()
+    ships = me.get_ships()
+    cells = [ship.position.y * game_map.width + ship.position.x for ship in ships]
+    targets = []
+    for ship in ships:
+        ppos = planned_pos(game_map, planned_moves, ship)
+        targets.append(ppos.y * game_map.width + ppos.x)
+    # move ship sitting on least halite
+    priorities = [-game_map[ship.position].halite_amount for ship in ships]
+
+    targets, downgraded = resolve_conflicts(cells, targets, priorities)
+    for ship, cell, target in zip(ships, cells, targets.tolist()):
+        if cell == target:
+            planned_moves[ship.id] = ship.stay_still()
+    logging.info('{} ships stopped to avoid collisions'.format(downgraded))
 
 while True:
     game.update_frame()